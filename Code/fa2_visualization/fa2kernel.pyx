@@ -0,0 +1,354 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+# Flat array version of fa2util: positions, forces and masses live in contiguous float64 arrays
+# and the edges in the CSR arrays (indptr, indices, weights) of the symmetric adjacency matrix.
+# Every force is accumulated by the node that receives it, so the loops over the nodes run in
+# parallel with OpenMP without two threads writing the same entry.
+from cython.parallel cimport prange
+from libc.math cimport sqrt
+import numpy
+
+cdef inline double linRepulsion(double xDist, double yDist, double mass, double coefficient) noexcept nogil:
+    cdef double distance2 = xDist * xDist + yDist * yDist  # Distance squared
+    if distance2 > 0:
+        return coefficient * mass / distance2
+    return 0.0
+
+def apply_repulsion(double[::1] x, double[::1] y, double[::1] mass, double[::1] dx, double[::1] dy,
+                      double coefficient, int threads=1):
+    cdef Py_ssize_t n = x.shape[0]
+    cdef Py_ssize_t i, j
+    cdef double xDist, yDist, factor, fx, fy
+
+    for i in prange(n, nogil=True, schedule='guided', num_threads=threads):
+        fx = 0.0
+        fy = 0.0
+        for j in range(n):
+            xDist = x[i] - x[j]
+            yDist = y[i] - y[j]
+            factor = linRepulsion(xDist, yDist, mass[i] * mass[j], coefficient)
+            fx = fx + xDist * factor
+            fy = fy + yDist * factor
+        dx[i] += fx
+        dy[i] += fy
+
+def apply_gravity(double[::1] x, double[::1] y, double[::1] mass, double[::1] dx, double[::1] dy,
+                    double gravity, double scalingRatio, bint useStrongGravity=False, int threads=1):
+    cdef Py_ssize_t n = x.shape[0]
+    cdef Py_ssize_t i
+    cdef double distance, factor
+
+    for i in prange(n, nogil=True, schedule='static', num_threads=threads):
+        if not useStrongGravity:
+            distance = sqrt(x[i] * x[i] + y[i] * y[i])
+            if distance > 0:
+                factor = mass[i] * gravity / distance
+                dx[i] -= x[i] * factor
+                dy[i] -= y[i] * factor
+        elif x[i] != 0 and y[i] != 0:
+            factor = scalingRatio * mass[i] * gravity
+            dx[i] -= x[i] * factor
+            dy[i] -= y[i] * factor
+
+def apply_attraction(double[::1] x, double[::1] y, double[::1] mass, double[::1] dx, double[::1] dy,
+                       long long[::1] indptr, int[::1] indices, double[::1] weights,
+                       bint distributedAttraction, double coefficient, int threads=1):
+    # weights are already raised to edgeWeightInfluence. Like fa2util.linAttraction, the distributed
+    # attraction of an edge is divided by the mass of its first node, the one with the lowest index
+    cdef Py_ssize_t n = x.shape[0]
+    cdef Py_ssize_t i, k
+    cdef int j
+    cdef double factor, fx, fy
+
+    for i in prange(n, nogil=True, schedule='guided', num_threads=threads):
+        fx = 0.0
+        fy = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            if not distributedAttraction:
+                factor = -coefficient * weights[k]
+            elif i < j:
+                factor = -coefficient * weights[k] / mass[i]
+            else:
+                factor = -coefficient * weights[k] / mass[j]
+            fx = fx + (x[i] - x[j]) * factor
+            fy = fy + (y[i] - y[j]) * factor
+        dx[i] += fx
+        dy[i] += fy
+
+def adjustSpeedAndApplyForces(double[::1] x, double[::1] y, double[::1] mass, double[::1] dx, double[::1] dy,
+                                double[::1] old_dx, double[::1] old_dy, double speed, double speedEfficiency,
+                                double jitterTolerance, int threads=1):
+    cdef Py_ssize_t n = x.shape[0]
+    cdef Py_ssize_t i
+    cdef double totalSwinging = 0.0
+    cdef double totalEffectiveTraction = 0.0
+    cdef double swinging, factor
+
+    for i in prange(n, nogil=True, schedule='static', num_threads=threads):
+        swinging = sqrt((old_dx[i] - dx[i]) * (old_dx[i] - dx[i]) + (old_dy[i] - dy[i]) * (old_dy[i] - dy[i]))
+        totalSwinging += mass[i] * swinging
+        totalEffectiveTraction += 0.5 * mass[i] * sqrt(
+            (old_dx[i] + dx[i]) * (old_dx[i] + dx[i]) + (old_dy[i] + dy[i]) * (old_dy[i] + dy[i]))
+
+    cdef double estimatedOptimalJitterTolerance = 0.05 * sqrt(n)
+    cdef double minJT = sqrt(estimatedOptimalJitterTolerance)
+    cdef double maxJT = 10
+    cdef double jt
+
+    jt = jitterTolerance * max(minJT,
+                               min(maxJT, estimatedOptimalJitterTolerance * totalEffectiveTraction / (n * n)))
+
+    cdef double minSpeedEfficiency = 0.05
+
+    if totalEffectiveTraction and totalSwinging / totalEffectiveTraction > 2.0:
+        if speedEfficiency > minSpeedEfficiency:
+            speedEfficiency *= 0.5
+        jt = max(jt, jitterTolerance)
+
+    cdef double targetSpeed
+    if totalSwinging == 0:
+        targetSpeed = float('inf')
+    else:
+        targetSpeed = jt * speedEfficiency * totalEffectiveTraction / totalSwinging
+
+    if totalSwinging > jt * totalEffectiveTraction:
+        if speedEfficiency > minSpeedEfficiency:
+            speedEfficiency *= 0.7
+    elif speedEfficiency < 1000:
+        speedEfficiency *= 1.3
+
+    cdef double maxRise = .5
+    speed = speed + min(targetSpeed - speed, maxRise * speed)
+
+    for i in prange(n, nogil=True, schedule='static', num_threads=threads):
+        swinging = mass[i] * sqrt((old_dx[i] - dx[i]) * (old_dx[i] - dx[i]) + (old_dy[i] - dy[i]) * (old_dy[i] - dy[i]))
+        factor = speed / (1.0 + sqrt(speed * swinging))
+        x[i] += dx[i] * factor
+        y[i] += dy[i] * factor
+
+    return {'speed': speed, 'speedEfficiency': speedEfficiency}
+
+cdef class QuadTree:
+    # Barnes Hut quadtree of fa2util.Region in flat arrays, allocated once for n graph nodes and
+    # rebuilt in place by build() every iteration. Every region covers the range start[r]:end[r] of
+    # order, a permutation of the graph nodes, and the regions are stored in preorder: the first
+    # subregion of r is r + 1 and skip[r] is the region after all of its subregions, so the
+    # traversal of applyForceOnNodes needs neither recursion nor a stack. Since every region with
+    # more than one node is split in at least two, there are at most 2n - 1 regions, so the memory
+    # is O(n) whatever the number of threads. Only the flat array engine (multiThreaded=True) uses
+    # it, the Node engine still builds fa2util.Region.
+    cdef readonly Py_ssize_t n, regions
+    cdef readonly int threads
+    cdef int[::1] order, buffer, start, end, skip, parent, subtree, leaf
+    cdef int[::1] stackStart, stackEnd, stackParent
+    cdef double[::1] mass, massCenterX, massCenterY, size
+
+    def __init__(self, Py_ssize_t n, int threads=1):
+        cdef Py_ssize_t capacity = max(2 * n, 1)
+        self.n = n
+        self.regions = 0
+        self.threads = max(threads, 1)
+        self.order = numpy.zeros(n, dtype=numpy.int32)
+        self.buffer = numpy.zeros(n, dtype=numpy.int32)
+        self.leaf = numpy.zeros(n, dtype=numpy.int32)
+        self.start = numpy.zeros(capacity, dtype=numpy.int32)
+        self.end = numpy.zeros(capacity, dtype=numpy.int32)
+        self.skip = numpy.zeros(capacity, dtype=numpy.int32)
+        self.parent = numpy.zeros(capacity, dtype=numpy.int32)
+        self.subtree = numpy.zeros(capacity, dtype=numpy.int32)
+        self.stackStart = numpy.zeros(capacity, dtype=numpy.int32)
+        self.stackEnd = numpy.zeros(capacity, dtype=numpy.int32)
+        self.stackParent = numpy.zeros(capacity, dtype=numpy.int32)
+        self.mass = numpy.zeros(capacity)
+        self.massCenterX = numpy.zeros(capacity)
+        self.massCenterY = numpy.zeros(capacity)
+        self.size = numpy.zeros(capacity)
+
+    cdef void updateMassAndGeometry(self, int r, double[::1] x, double[::1] y, double[::1] mass) noexcept nogil:
+        cdef int k, i
+        cdef double massSumX = 0
+        cdef double massSumY = 0
+        cdef double distance
+
+        self.mass[r] = 0
+        for k in range(self.start[r], self.end[r]):
+            i = self.order[k]
+            self.mass[r] += mass[i]
+            massSumX += x[i] * mass[i]
+            massSumY += y[i] * mass[i]
+
+        self.massCenterX[r] = massSumX / self.mass[r]
+        self.massCenterY[r] = massSumY / self.mass[r]
+
+        self.size[r] = 0.0
+        for k in range(self.start[r], self.end[r]):
+            i = self.order[k]
+            distance = sqrt((x[i] - self.massCenterX[r]) ** 2 + (y[i] - self.massCenterY[r]) ** 2)
+            self.size[r] = max(self.size[r], 2 * distance)
+
+    cdef void buildSubRegions(self, double[::1] x, double[::1] y, double[::1] mass) noexcept nogil:
+        cdef int top = 0
+        cdef int r, s, e, k, i, q, quadrant
+        cdef int counts[4]
+        cdef int offsets[4]
+
+        for i in range(self.n):
+            self.order[i] = i
+        self.regions = 0
+        if self.n == 0:
+            return
+
+        self.stackStart[0] = 0
+        self.stackEnd[0] = <int>self.n
+        self.stackParent[0] = -1
+        top = 1
+        while top > 0:
+            top -= 1
+            s = self.stackStart[top]
+            e = self.stackEnd[top]
+            r = <int>self.regions
+            self.regions += 1
+            self.start[r] = s
+            self.end[r] = e
+            self.parent[r] = self.stackParent[top]
+            self.subtree[r] = 1
+            if e - s < 2:
+                self.leaf[self.order[s]] = r
+                continue
+            self.updateMassAndGeometry(r, x, y, mass)
+
+            # Quadrants in the order of Region.buildSubRegions: topleft, bottomleft, topright, bottomright
+            for q in range(4):
+                counts[q] = 0
+            for k in range(s, e):
+                i = self.order[k]
+                quadrant = (0 if x[i] < self.massCenterX[r] else 2) + (1 if y[i] < self.massCenterY[r] else 0)
+                counts[quadrant] += 1
+
+            if counts[0] == e - s or counts[1] == e - s or counts[2] == e - s or counts[3] == e - s:
+                # All the nodes are in the same quadrant: one subregion per node.
+                # Pushed in reverse so they are popped, and stored, in order
+                for k in range(e - 1, s - 1, -1):
+                    self.stackStart[top] = k
+                    self.stackEnd[top] = k + 1
+                    self.stackParent[top] = r
+                    top += 1
+                continue
+
+            # Stable partition of the range, like appending the nodes to the four lists
+            offsets[0] = s
+            for q in range(1, 4):
+                offsets[q] = offsets[q - 1] + counts[q - 1]
+            for k in range(s, e):
+                i = self.order[k]
+                quadrant = (0 if x[i] < self.massCenterX[r] else 2) + (1 if y[i] < self.massCenterY[r] else 0)
+                self.buffer[offsets[quadrant]] = i
+                offsets[quadrant] += 1
+            for k in range(s, e):
+                self.order[k] = self.buffer[k]
+
+            for q in range(3, -1, -1):
+                if counts[q] > 0:
+                    self.stackStart[top] = offsets[q] - counts[q]
+                    self.stackEnd[top] = offsets[q]
+                    self.stackParent[top] = r
+                    top += 1
+
+        # Preorder: the subregions of r are the next subtree[r] - 1 regions
+        for r in range(<int>self.regions - 1, -1, -1):
+            self.skip[r] = r + self.subtree[r]
+            if r > 0:
+                self.subtree[self.parent[r]] += self.subtree[r]
+
+    def build(self, double[::1] x, double[::1] y, double[::1] mass):
+        assert x.shape[0] == self.n, "The QuadTree was allocated for a different number of nodes"
+        with nogil:
+            self.buildSubRegions(x, y, mass)
+
+    def applyForceOnNodes(self, double[::1] x, double[::1] y, double[::1] mass, double[::1] dx, double[::1] dy,
+                          double theta, double coefficient=0):
+        # Same forces as Region.applyForceOnNodes. There, a region with a single node applies the repulsion
+        # on both nodes, like linRepulsion, so node i is also pushed by every node j whose traversal reaches
+        # the single node region of i, i.e. j opens every region that contains i. Those j are found by a
+        # second traversal that skips the regions that surely approximate one of the regions of i, so each
+        # node only accumulates its own forces and no thread writes the forces of other nodes
+        cdef Py_ssize_t n = self.n
+        cdef Py_ssize_t regions = self.regions
+        cdef Py_ssize_t i
+        cdef int r, j, a
+        cdef bint opens
+        cdef double xDist, yDist, distance2, factor, fx, fy, reach
+        cdef int[::1] order = self.order, start = self.start, end = self.end, skip = self.skip
+        cdef int[::1] parent = self.parent, leaf = self.leaf
+        cdef double[::1] regionMass = self.mass, massCenterX = self.massCenterX, massCenterY = self.massCenterY
+        cdef double[::1] size = self.size
+        cdef int threads = self.threads
+
+        for i in prange(n, nogil=True, schedule='guided', num_threads=threads):
+            fx = 0.0
+            fy = 0.0
+
+            # Forces of i on its own traversal
+            r = 0
+            while r < regions:
+                if end[r] - start[r] < 2:
+                    j = order[start[r]]
+                    xDist = x[i] - x[j]
+                    yDist = y[i] - y[j]
+                    factor = linRepulsion(xDist, yDist, mass[i] * mass[j], coefficient)
+                    fx = fx + xDist * factor
+                    fy = fy + yDist * factor
+                    r = skip[r]
+                else:
+                    xDist = x[i] - massCenterX[r]
+                    yDist = y[i] - massCenterY[r]
+                    distance2 = xDist * xDist + yDist * yDist
+                    if sqrt(distance2) * theta > size[r]:
+                        factor = linRepulsion(xDist, yDist, mass[i] * regionMass[r], coefficient)
+                        fx = fx + xDist * factor
+                        fy = fy + yDist * factor
+                        r = skip[r]
+                    else:
+                        r = r + 1
+
+            # Forces of the traversals of other nodes that reach the single node region of i
+            r = 0
+            while r < regions:
+                if end[r] - start[r] < 2:
+                    j = order[start[r]]
+                    reach = 0.0
+                else:
+                    j = -1
+                    # All the nodes of r are at most size[r] / 2 from its mass center
+                    reach = size[r] / 2
+                opens = True
+                a = parent[leaf[i]]
+                while a >= 0 and opens:
+                    if j >= 0:
+                        xDist = x[j] - massCenterX[a]
+                        yDist = y[j] - massCenterY[a]
+                    else:
+                        xDist = massCenterX[r] - massCenterX[a]
+                        yDist = massCenterY[r] - massCenterY[a]
+                    distance2 = xDist * xDist + yDist * yDist
+                    if j >= 0:
+                        opens = not (sqrt(distance2) * theta > size[a])
+                    else:
+                        # Conservative, with some slack for the rounding of the bounds
+                        opens = not ((sqrt(distance2) - reach) * theta > size[a] * (1 + 1e-9) + 1e-300)
+                    a = parent[a]
+                if not opens:
+                    r = skip[r]
+                elif j < 0:
+                    r = r + 1
+                else:
+                    if j != i:
+                        xDist = x[i] - x[j]
+                        yDist = y[i] - y[j]
+                        factor = linRepulsion(xDist, yDist, mass[i] * mass[j], coefficient)
+                        fx = fx + xDist * factor
+                        fy = fy + yDist * factor
+                    r = skip[r]
+
+            dx[i] += fx
+            dy[i] += fy
@@ -18,6 +18,7 @@
 #
 # Available under the GPLv3
 
+import os
 import random
 import time
 
@@ -25,6 +26,11 @@ import numpy
 import scipy
 from tqdm import tqdm
 from fa2_visualization import fa2util
+try:
+    # Only needed with multiThreaded=True, it is built with OpenMP by setup.py
+    from fa2_visualization import fa2kernel
+except ImportError:
+    fa2kernel = None
 
 class Timer:
     def __init__(self, name="Timer"):
@@ -54,7 +60,8 @@ class ForceAtlas2:
                  jitterTolerance=1.0,  # Tolerance
                  barnesHutOptimize=True,
                  barnesHutTheta=1.2,
-                 multiThreaded=False,  # NOT IMPLEMENTED
+                 multiThreaded=False,  # Flat array engine with OpenMP threads, see fa2kernel
+                 threadCount=None,  # Threads of multiThreaded, by default OMP_NUM_THREADS or all the cores
 
                  # Tuning
                  scalingRatio=2.0,
@@ -63,7 +70,7 @@ class ForceAtlas2:
 
                  # Log
                  verbose=True):
-        assert linLogMode == adjustSizes == multiThreaded == False, "You selected a feature that has not been implemented yet..."
+        assert linLogMode == adjustSizes == False, "You selected a feature that has not been implemented yet..."
         self.outboundAttractionDistribution = outboundAttractionDistribution
         self.linLogMode = linLogMode
         self.adjustSizes = adjustSizes
@@ -71,6 +78,15 @@ class ForceAtlas2:
         self.jitterTolerance = jitterTolerance
         self.barnesHutOptimize = barnesHutOptimize
         self.barnesHutTheta = barnesHutTheta
+        if multiThreaded and fa2kernel is None:
+            raise ImportError("multiThreaded=True needs the fa2kernel extension, build it with setup.py")
+        if not multiThreaded:
+            threadCount = 1
+        elif threadCount is None:
+            threadCount = int(os.environ.get('OMP_NUM_THREADS', '').split(',')[0] or os.cpu_count() or 1)
+        assert threadCount >= 1, "threadCount must be at least 1"
+        self.multiThreaded = multiThreaded
+        self.threadCount = threadCount
         self.scalingRatio = scalingRatio
         self.strongGravityMode = strongGravityMode
         self.gravity = gravity
@@ -128,6 +144,52 @@ class ForceAtlas2:
 
         return nodes, edges
 
+    # Same as init, but for the flat array engine of fa2kernel: the nodes are
+    # float64 arrays and the edges are the CSR arrays of the symmetric matrix,
+    # read at once from the sparse matrix instead of one lookup per edge.
+    def init_arrays(self,
+                    G,  # a graph in 2D numpy ndarray format (or) scipy sparse matrix format
+                    pos=None  # Array of initial positions
+                    ):
+        if isinstance(G, numpy.ndarray):
+            # Check our assumptions
+            assert G.shape == (G.shape[0], G.shape[0]), "G is not 2D square"
+            assert numpy.all(G.T == G), "G is not symmetric.  Currently only undirected graphs are supported"
+            assert isinstance(pos, numpy.ndarray) or (pos is None), "Invalid node positions"
+        elif scipy.sparse.issparse(G):
+            # Check our assumptions
+            assert G.shape == (G.shape[0], G.shape[0]), "G is not 2D square"
+            assert isinstance(pos, numpy.ndarray) or (pos is None), "Invalid node positions"
+        else:
+            assert False, "G is not numpy ndarray or scipy sparse matrix"
+        G = scipy.sparse.csr_matrix(G, dtype=numpy.float64)
+        G.sum_duplicates()
+
+        # Nodes
+        mass = 1.0 + numpy.diff(G.indptr).astype(numpy.float64)
+        if pos is None:
+            pos = numpy.array([(random.random(), random.random()) for _ in range(G.shape[0])])
+        x = numpy.array(pos[:, 0], dtype=numpy.float64)
+        y = numpy.array(pos[:, 1], dtype=numpy.float64)
+
+        # Edges: like init, each edge is the entry above the diagonal, then it is mirrored
+        # so every node finds all of its edges in its own row
+        upper = scipy.sparse.triu(G, k=1, format='csr')
+        upper.eliminate_zeros()
+        edges = (upper + upper.T).tocsr()
+        edges.sort_indices()
+        if self.edgeWeightInfluence == 0:
+            weights = numpy.ones(edges.nnz)
+        elif self.edgeWeightInfluence == 1:
+            weights = edges.data
+        else:
+            weights = numpy.power(edges.data, self.edgeWeightInfluence)
+
+        indptr = numpy.ascontiguousarray(edges.indptr, dtype=numpy.int64)
+        indices = numpy.ascontiguousarray(edges.indices, dtype=numpy.int32)
+        weights = numpy.ascontiguousarray(weights, dtype=numpy.float64)
+        return x, y, mass, indptr, indices, weights
+
     # Given an adjacency matrix, this function computes the node positions
     # according to the ForceAtlas2 layout algorithm.  It takes the same
     # arguments that one would give to the ForceAtlas2 algorithm in Gephi.
@@ -149,6 +211,9 @@ class ForceAtlas2:
                     pos=None,  # Array of initial positions
                     iterations=100  # Number of times to iterate the main loop
                     ):
+        if self.multiThreaded:
+            return self.forceatlas2_arrays(G, pos, iterations)
+
         # Initializing, initAlgo()
         # ================================================================
 
@@ -183,7 +248,8 @@ class ForceAtlas2:
                 n.dx = 0
                 n.dy = 0
 
-            # Barnes Hut optimization
+            # Barnes Hut optimization. Only the flat array engine keeps the quadtree in
+            # preallocated arrays, this one still builds fa2util.Region every iteration
             if self.barnesHutOptimize:
                 barneshut_timer.start()
                 rootRegion = fa2util.Region(nodes)
@@ -227,6 +293,98 @@ class ForceAtlas2:
         # ================================================================
         return [(n.x, n.y) for n in nodes]
 
+    # The same algorithm as forceatlas2, with the flat array engine of
+    # fa2kernel.  Repulsion, gravity, attraction and the speed adjustment
+    # run in parallel over the nodes with self.threadCount OpenMP threads.
+    # Barnes Hut uses fa2kernel.QuadTree, rebuilt in place every iteration
+    # in O(n) memory.  The result is the same layout up to the rounding of
+    # the sums.
+    def forceatlas2_arrays(self,
+                           G,  # a graph in 2D numpy ndarray format (or) scipy sparse matrix format
+                           pos=None,  # Array of initial positions
+                           iterations=100  # Number of times to iterate the main loop
+                           ):
+        # Initializing, initAlgo()
+        # ================================================================
+        speed = 1.0
+        speedEfficiency = 1.0
+        x, y, mass, indptr, indices, weights = self.init_arrays(G, pos)
+        dx = numpy.zeros_like(x)
+        dy = numpy.zeros_like(y)
+        old_dx = numpy.zeros_like(x)
+        old_dy = numpy.zeros_like(y)
+        outboundAttCompensation = 1.0
+        if self.outboundAttractionDistribution:
+            outboundAttCompensation = numpy.mean(mass)
+        if self.barnesHutOptimize:
+            quadTree = fa2kernel.QuadTree(len(x), self.threadCount)
+        # ================================================================
+
+        # Main loop, i.e. goAlgo()
+        # ================================================================
+
+        barneshut_timer = Timer(name="BarnesHut Approximation")
+        repulsion_timer = Timer(name="Repulsion forces")
+        gravity_timer = Timer(name="Gravitational forces")
+        attraction_timer = Timer(name="Attraction forces")
+        applyforces_timer = Timer(name="AdjustSpeedAndApplyForces step")
+
+        niters = range(iterations)
+        if self.verbose:
+            niters = tqdm(niters)
+        for _i in niters:
+            # The forces of the last iteration become the old ones
+            dx, old_dx = old_dx, dx
+            dy, old_dy = old_dy, dy
+            dx.fill(0)
+            dy.fill(0)
+
+            # Barnes Hut optimization, the quadtree is rebuilt in its own arrays
+            if self.barnesHutOptimize:
+                barneshut_timer.start()
+                quadTree.build(x, y, mass)
+                barneshut_timer.stop()
+
+            # Charge repulsion forces
+            repulsion_timer.start()
+            if self.barnesHutOptimize:
+                quadTree.applyForceOnNodes(x, y, mass, dx, dy, self.barnesHutTheta, self.scalingRatio)
+            else:
+                fa2kernel.apply_repulsion(x, y, mass, dx, dy, self.scalingRatio, self.threadCount)
+            repulsion_timer.stop()
+
+            # Gravitational forces
+            gravity_timer.start()
+            fa2kernel.apply_gravity(x, y, mass, dx, dy, self.gravity, self.scalingRatio,
+                                    self.strongGravityMode, self.threadCount)
+            gravity_timer.stop()
+
+            # If other forms of attraction were implemented they would be selected here.
+            attraction_timer.start()
+            fa2kernel.apply_attraction(x, y, mass, dx, dy, indptr, indices, weights,
+                                       self.outboundAttractionDistribution, outboundAttCompensation,
+                                       self.threadCount)
+            attraction_timer.stop()
+
+            # Adjust speeds and apply forces
+            applyforces_timer.start()
+            values = fa2kernel.adjustSpeedAndApplyForces(x, y, mass, dx, dy, old_dx, old_dy, speed,
+                                                         speedEfficiency, self.jitterTolerance,
+                                                         self.threadCount)
+            speed = values['speed']
+            speedEfficiency = values['speedEfficiency']
+            applyforces_timer.stop()
+
+        if self.verbose:
+            if self.barnesHutOptimize:
+                barneshut_timer.display()
+            repulsion_timer.display()
+            gravity_timer.display()
+            attraction_timer.display()
+            applyforces_timer.display()
+        # ================================================================
+        return list(zip(x.tolist(), y.tolist()))
+
     # A layout for NetworkX.
     #
     # This function returns a NetworkX layout, which is really just a
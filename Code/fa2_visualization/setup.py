@@ -1,8 +1,16 @@
-from setuptools import setup
+from setuptools import setup, Extension
 from Cython.Build import cythonize
 
+# fa2kernel runs its loops in parallel with OpenMP
+extensions = [
+    Extension('fa2util', ['fa2util.pyx']),
+    Extension('fa2kernel', ['fa2kernel.pyx'],
+              extra_compile_args=['-fopenmp', '-O3'],
+              extra_link_args=['-fopenmp']),
+]
+
 setup(
     name='FA2 Utils',
-    ext_modules=cythonize("fa2util.pyx"),
+    ext_modules=cythonize(extensions),
     zip_safe=False
-)
\ No newline at end of file
+)
@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+gt = pytest.importorskip('graph_tool.all')
+from utils.GraphTransform import get_descriptors, get_property_values, to_graphtool, to_networkx
+
+#==============================================================================
+# Valores de prueba para cada tipo de PropertyMap de graph-tool, en función del índice del vértice o arista
+#==============================================================================
+VALUE_TYPES = {
+    'bool': lambda i: i % 2 == 0,
+    'int16_t': lambda i: i - 3,
+    'int32_t': lambda i: 1000 * i,
+    'int64_t': lambda i: 2**40 + i,
+    'double': lambda i: i / 3,
+    'long double': lambda i: i / 4,
+    'string': lambda i: f'Nodo {i}',
+    'vector<bool>': lambda i: [True, i % 2 == 0][:i % 2 + 1],
+    'vector<int16_t>': lambda i: list(range(-i, 1)),
+    'vector<int32_t>': lambda i: [1000 * i] * (i % 3 + 1),
+    'vector<int64_t>': lambda i: [2**40, i],
+    'vector<double>': lambda i: [i / 3, -i / 7][:i % 2 + 1],
+    'vector<long double>': lambda i: [i / 4],
+    'vector<string>': lambda i: ['Izquierda', '', f'Nodo {i}'][:i % 3 + 1],
+    'python::object': lambda i: {'Node': i, 'Labels': ('Centro', i)},
+}
+
+GRAPH_VALUES = {
+    'Date': ('string', '2021-04-28'),
+    'Tweets': ('int64_t', 2**40),
+    'Density': ('double', 0.25),
+    'Groups': ('vector<string>', ['Centro', 'Derecha', 'Izquierda']),
+}
+
+def as_python(value):
+    """
+    Converts the vectors of graph-tool to lists to compare them with ==.
+    """
+    if hasattr(value, '__len__') and not isinstance(value, (str, dict, tuple)):
+        return list(value)
+    return value
+
+def make_graph(directed: bool) -> gt.Graph:
+    """
+    Builds a small graph with a self loop, an isolated vertex and one vertex, edge and graph property of every
+    value type.
+    """
+    g = gt.Graph(directed=directed)
+    g.add_vertex(7)
+    g.add_edge_list([(0, 1), (1, 0), (1, 2), (2, 2), (3, 0), (4, 5), (5, 3), (2, 4)] if directed else
+                    [(0, 1), (1, 2), (2, 2), (3, 0), (4, 5), (5, 3), (2, 4)])
+    for value_type, value in VALUE_TYPES.items():
+        g.vp[value_type] = g.new_vertex_property(value_type, vals=[value(int(v)) for v in g.vertices()])
+        g.ep[value_type] = g.new_edge_property(value_type, vals=[value(int(g.edge_index[e])) for e in g.edges()])
+    for key, (value_type, value) in GRAPH_VALUES.items():
+        g.gp[key] = g.new_gp(value_type, val=value)
+    return g
+
+def edge_values(g: gt.Graph, name: str) -> dict:
+    """
+    Values of an EdgePropertyMap by (source, target), so that the comparison does not depend on the edge indexes.
+    """
+    values = {}
+    for e in g.edges():
+        key = (int(e.source()), int(e.target()))
+        values[key if g.is_directed() else tuple(sorted(key))] = as_python(g.ep[name][e])
+    return values
+
+#==============================================================================
+# Ida y vuelta graph-tool -> NetworkX -> graph-tool
+#==============================================================================
+@pytest.mark.parametrize('directed', [True, False])
+def test_round_trip(directed):
+    g = make_graph(directed)
+    G = to_networkx(g)
+    h = to_graphtool(G)
+
+    # Estructura
+    assert h.is_directed() == g.is_directed()
+    assert h.num_vertices() == g.num_vertices() == G.number_of_nodes()
+    assert h.num_edges() == g.num_edges() == G.number_of_edges()
+    assert set(edge_values(h, 'int32_t')) == set(edge_values(g, 'int32_t'))
+
+    # Propiedades de vértices, aristas y del grafo
+    assert set(h.vp.keys()) == set(g.vp.keys()) == set(VALUE_TYPES)
+    assert set(h.ep.keys()) == set(g.ep.keys()) == set(VALUE_TYPES)
+    for name in VALUE_TYPES:
+        assert [as_python(h.vp[name][v]) for v in h.vertices()] == [as_python(g.vp[name][v]) for v in g.vertices()], name
+        assert edge_values(h, name) == edge_values(g, name), name
+    assert {key: as_python(h.gp[key]) for key in h.gp.keys()} == {key: as_python(g.gp[key]) for key in GRAPH_VALUES}
+
+def test_shared_descriptors():
+    g = make_graph(True)
+    index = g.get_edges([g.edge_index])[::-1, 2]
+    keys = get_descriptors(g, index, 'e')
+    assert [int(g.edge_index[e]) for e in keys] == index.tolist()
+    for name in ['string', 'vector<double>', 'python::object']:
+        assert get_property_values(g.ep[name], index, keys) == get_property_values(g.ep[name], index), name
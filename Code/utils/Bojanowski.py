@@ -5,6 +5,9 @@ import pandas as pd
 import networkx as nx
 import random
 import math
+import weakref
+import scipy.sparse as sp
+from typing import NamedTuple
 
 def get_adjacency(g : gt.Graph, weight = None) -> np.ndarray:
     """
@@ -17,6 +20,21 @@ def get_adjacency(g : gt.Graph, weight = None) -> np.ndarray:
     Returns:
         ndarray: Adjcancecy Matrix
 
+    """
+    return get_sparse_adjacency(g, weight).toarray()
+
+def get_sparse_adjacency(g : gt.Graph, weight = None) -> sp.csr_matrix:
+    """
+    Gets the Adjacency Matrix of the graph as a sparse CSR matrix. rows are Source nodes and columns are Target Nodes.
+    Memory is O(E + N), so this is the one to use with graphs that have every user of the Master Index as a vertex.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        weight (String): The name of the PropertyMap where weights of the edges resides.
+
+    Returns:
+        csr_matrix: Sparse Adjacency Matrix
+
     """
     # Get EdgePropertyMap for Weights in Adjacency
     if weight is not None:
@@ -24,7 +42,7 @@ def get_adjacency(g : gt.Graph, weight = None) -> np.ndarray:
     else: weights = weight
 
     adj = gt.adjacency(g, weight = weights).T
-    return adj.toarray()
+    return sp.csr_matrix(adj)
 
 def get_types_array(g: gt.Graph, property_label:str) -> np.ndarray:
     """
@@ -45,6 +63,67 @@ def get_types_array(g: gt.Graph, property_label:str) -> np.ndarray:
         t = property_map.a
     return t
 
+class TypesEncoding(NamedTuple):
+    """
+    Encoding of the groups of a vertex PropertyMap, computed once per graph and property.
+
+    Attributes:
+        groups (ndarray): The different values of the property, in the order of np.unique.
+        codes (ndarray): Integer code of each node. The code is the position of its group in groups.
+        index (dict): Dictionary where the keys are groups (as strings) and the values are their codes.
+            Same as get_types_index.
+        matrix (csr_matrix): Sparse one-hot matrix of shape (N,G). Same columns as get_types_matrix,
+            so for bool properties the columns are reversed (True first).
+        sizes (ndarray): Number of nodes in each column of matrix.
+    """
+    groups: np.ndarray
+    codes: np.ndarray
+    index: dict
+    matrix: sp.csr_matrix
+    sizes: np.ndarray
+
+# Encodings already computed, by graph and by property name
+_types_cache = weakref.WeakKeyDictionary()
+
+def get_types_encoding(g: gt.Graph, types:str) -> TypesEncoding:
+    """
+    Gets the encoding of the groups of a vertex PropertyMap: integer codes, the group to index map and the
+    sparse types matrix. It is computed once and cached, so every helper in this module reuses it. Views of
+    the same graph share the cache. If the values of the PropertyMap are modified in place the encoding is
+    not recomputed.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        types (String): The name of the PropertyMap where tipification of the groups resides.
+
+    Returns:
+        TypesEncoding: groups, codes, index, matrix and sizes of the property.
+
+    """
+    base = getattr(g, "base", g)
+    property_map = base.vp[types]
+    cache = _types_cache.setdefault(base, {})
+    if types in cache and cache[types][0] is property_map:
+        return cache[types][1]
+
+    # Get array of types
+    t = get_types_array(base, types)
+    groups, codes = np.unique(t, return_inverse=True)
+    codes = codes.ravel()
+    index = {str(tipo): i for i, tipo in enumerate(groups)}
+
+    # Columns of the types matrix. Bool properties are reversed so True comes first
+    columns = codes
+    if property_map.value_type() == 'bool':
+        columns = len(groups) - 1 - codes
+    N = len(codes)
+    matrix = sp.csr_matrix((np.ones(N), (np.arange(N), columns)), shape=(N, len(groups)))
+    sizes = np.bincount(columns, minlength=len(groups))
+
+    encoding = TypesEncoding(groups, codes, index, matrix, sizes)
+    cache[types] = (property_map, encoding)
+    return encoding
+
 def get_types_dict(g: gt.Graph, types:str) -> dict:
     """
     gets the Dictionary where the keys are groups and the values are arrays.
@@ -59,18 +138,8 @@ def get_types_dict(g: gt.Graph, types:str) -> dict:
         Each array has a 1 if that node corresponds to that group and 0 if not
 
     """
-    # Get array of types
-    t = get_types_array(g,types)
-    T = {}
-    for tipo in np.unique(t):
-        row=[]
-        for i in t:
-            if i == tipo:
-                row.append(1)
-            else:
-                row.append(0)        
-        T[str(tipo)] = row
-    return T
+    encoding = get_types_encoding(g, types)
+    return {tipo: (encoding.codes == i).astype(int).tolist() for tipo, i in encoding.index.items()}
 
 def get_types_index(g: gt.Graph, types:str) -> dict:
     """
@@ -86,9 +155,7 @@ def get_types_index(g: gt.Graph, types:str) -> dict:
         non contact layer. Also have the indexes for the types matrix.
 
     """
-    T = get_types_dict(g, types)
-    Type_to_row = {k:v for v,k in enumerate(T.keys())}
-    return Type_to_row
+    return dict(get_types_encoding(g, types).index)
 
 def get_types_matrix(g:gt.Graph , types:str) -> np.ndarray:
     """
@@ -102,11 +169,65 @@ def get_types_matrix(g:gt.Graph , types:str) -> np.ndarray:
         ndarray: Matrix of shape (N,G) where each column is a types vector from the types dict.
 
     """
-    types_dict = get_types_dict(g,types = types)
-    types_vector = list(types_dict.values())
-    if g.vp[types].value_type() == 'bool':
-        types_vector = types_vector[::-1]
-    return np.array(types_vector).T
+    return get_types_encoding(g, types).matrix.toarray().astype(int)
+
+def get_sparse_types_matrix(g:gt.Graph , types:str) -> sp.csr_matrix:
+    """
+    Calculate a sparse one-hot matrix of shape (N,G). It has the same columns, in the same order, as get_types_matrix.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        types (String): The name of the PropertyMap where tipification of the groups resides.
+
+    Returns:
+        csr_matrix: Sparse matrix of shape (N,G) where entry (i, k) is 1 if node i belongs to group k.
+
+    """
+    return get_types_encoding(g, types).matrix
+
+def sparse_contact_layer(adj: sp.csr_matrix, types_matrix: sp.csr_matrix, directed = True) -> np.ndarray:
+    """
+    Calculates the contact layer T^T·A·T from a sparse adjacency and a sparse types matrix.
+
+    Args:
+        adj (csr_matrix): Sparse Adjacency Matrix of shape (N,N), rows are Source nodes.
+        types_matrix (csr_matrix): Sparse one-hot matrix of shape (N,G).
+        directed (bool): If False, the lower triangle is dropped and the diagonal halved, as for undirected graphs.
+
+    Returns:
+        ndarray: Matrix of shape (G,G) with the number (or the weight) of ties between or within groups.
+
+    """
+    M = (types_matrix.T @ adj @ types_matrix).toarray()
+
+    if directed:
+        return M
+    else:
+        M[np.tril_indices(M.shape[0], k=-1)] = 0
+        np.fill_diagonal(M, M.diagonal() / 2)
+        return M
+
+def sparse_non_contact_layer(adj: sp.csr_matrix, types_matrix: sp.csr_matrix) -> np.ndarray:
+    """
+    Calculates the non contact layer from the group sizes and the contact layer. T^T·(1 - A)·T is equal to
+    n·n^T - T^T·A·T, so the dense matrix 1 - A is never built.
+
+    Args:
+        adj (csr_matrix): Sparse unweighted Adjacency Matrix of shape (N,N), rows are Source nodes.
+        types_matrix (csr_matrix): Sparse one-hot matrix of shape (N,G).
+
+    Returns:
+        ndarray: Matrix of shape (G,G) with the number of NON ties between or within groups.
+
+    """
+    n = np.asarray(types_matrix.sum(axis=0)).ravel().astype(np.int64)
+    M_1 = (types_matrix.T @ adj @ types_matrix).toarray()
+    M = np.outer(n, n) - M_1
+
+    # Within groups only ordered pairs of different nodes are possible dyads
+    total_dyads = np.where(n < 2, 0, n * (n - 1))
+    np.fill_diagonal(M, total_dyads - np.diag(M_1))
+    return M
 
 def get_contact_layer(g, property_label:str , weights = None) -> np.ndarray:
     """
@@ -122,17 +243,9 @@ def get_contact_layer(g, property_label:str , weights = None) -> np.ndarray:
         See Bojanowski for more info. If weights provided, it calculates the summ of the weights between or within groups.
 
     """
-    adj = get_adjacency(g, weights)
-    types_matrix = get_types_matrix(g, property_label)
-    M = types_matrix.T.dot(adj).dot(types_matrix)
-
-    if g.is_directed():
-        return M
-    else: 
-        M_undir = np.copy(M)
-        M_undir[np.tril_indices(M.shape[0], k=-1)] = 0
-        np.fill_diagonal(M_undir, M_undir.diagonal() / 2)
-        return M_undir
+    adj = get_sparse_adjacency(g, weights)
+    types_matrix = get_sparse_types_matrix(g, property_label)
+    return sparse_contact_layer(adj, types_matrix, directed = g.is_directed())
 
 def get_non_contact_layer(g, property_label = None) -> np.ndarray:
     """
@@ -147,26 +260,9 @@ def get_non_contact_layer(g, property_label = None) -> np.ndarray:
         See Bojanowski for more info.
 
     """
-    adj_1 = get_adjacency(g)
-    adj = 1 - adj_1
-    
-    types_matrix = get_types_matrix(g, property_label = property_label)
-    M = types_matrix.T.dot(adj).dot(types_matrix)
-    M_1 = types_matrix.T.dot(adj_1).dot(types_matrix)
-    contact_diag = np.diag(M_1)
-    
-    total_dyads = []
-    for g in range(types_matrix.shape[1]):
-        G_g = np.sum(types_matrix[:, g])
-        if G_g < 2:
-            M_gg = 0
-        else:
-            M_gg = math.perm(G_g,2)
-        total_dyads.append(M_gg)
-    non_contact_diag = np.array(total_dyads) - contact_diag
-    np.fill_diagonal(M, non_contact_diag)
-        
-    return M
+    adj = get_sparse_adjacency(g)
+    types_matrix = get_sparse_types_matrix(g, property_label)
+    return sparse_non_contact_layer(adj, types_matrix)
       
 def me_vs_others(g: gt.Graph, group_index: int, property_label:str, weights = None) -> np.ndarray:
     """
@@ -0,0 +1,317 @@
+import graph_tool.all as gt
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, shortest_path
+from typing import NamedTuple
+
+class Diameter(NamedTuple):
+    """
+    Diameter of a graph with the bounds that were proven.
+
+    Attributes:
+        value (float): The diameter. In the approximate mode it is the lower bound.
+        lower (float): Lower bound, the longest shortest path that was found.
+        upper (float): Upper bound of the diameter. Equal to lower in the exact mode.
+        sweeps (int): Number of shortest path searches (BFS or Dijkstra) that were needed.
+    """
+    value: float
+    lower: float
+    upper: float
+    sweeps: int
+
+#=========================================================================================================================
+def get_length_matrix(g: gt.Graph, weight = None, directed = False) -> sp.csr_matrix:
+    """
+    Gets the matrix of edge lengths of the graph. By default it is the symmetric matrix of the undirected version of
+    the graph. When there are edges in both directions, or parallel edges, the shortest one is kept. Self loops are
+    dropped since they never are part of a shortest path. Explicit zeros are edges of length 0.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        weight (String): The name of the EdgePropertyMap used as length. By default every edge has length 1.
+        directed (bool): If True, the entry (i,j) is the shortest edge i -> j and the matrix is not symmetric.
+
+    Returns:
+        csr_matrix: Sparse matrix of shape (N,N) with the length of every edge
+    """
+    N = g.num_vertices()
+    if weight is None:
+        edges = g.get_edges()
+        lengths = np.ones(len(edges))
+    else:
+        edges = g.get_edges([g.ep[weight]])
+        lengths = edges[:, 2].astype(float)
+    source = edges[:, 0].astype(np.int64)
+    target = edges[:, 1].astype(np.int64)
+
+    # Without self loops and, for the undirected version, in both directions
+    keep = source != target
+    if directed:
+        row, col, data = source[keep], target[keep], lengths[keep]
+    else:
+        row = np.concatenate([source[keep], target[keep]])
+        col = np.concatenate([target[keep], source[keep]])
+        data = np.concatenate([lengths[keep], lengths[keep]])
+
+    # Shortest edge of each pair: sort by pair and length and keep the first one
+    order = np.lexsort((data, col, row))
+    row, col, data = row[order], col[order], data[order]
+    first = np.ones(len(row), dtype=bool)
+    first[1:] = (row[1:] != row[:-1]) | (col[1:] != col[:-1])
+    return sp.csr_matrix((data[first], (row[first], col[first])), shape=(N, N))
+
+#=========================================================================================================================
+def component_diameter(L: sp.csr_matrix, unweighted = True, exact = True, k = 4, lower = 0.0) -> Diameter:
+    """
+    Diameter of a connected graph with the BoundingDiameters algorithm (Takes & Kosters, 2011), the bound pruning
+    generalization of iFUB that also works with weights. Every search from a vertex v gives its eccentricity e(v)
+    and bounds the eccentricity of every other vertex w: max(e(v) - d(v,w), d(v,w)) <= e(w) <= e(v) + d(v,w).
+    Vertices whose upper bound can't beat the diameter found so far are discarded, so only a few searches are needed.
+
+    The approximate mode only makes k searches, the first ones from the vertex of highest degree and then from the
+    farthest vertex found (k-sweep), and returns the bounds that were reached.
+
+    Args:
+        L (csr_matrix): Symmetric length matrix of a connected graph, see get_length_matrix.
+        unweighted (bool): If True, every edge has length 1 and BFS is used instead of Dijkstra.
+        exact (bool): If False, stop after k searches.
+        k (int): Number of searches of the approximate mode.
+        lower (float): Diameter already known, e.g. of other components. Vertices that can't beat it are discarded.
+
+    Returns:
+        Diameter: The diameter of the graph and its bounds
+    """
+    n = L.shape[0]
+    if n == 1:
+        return Diameter(0.0, 0.0, 0.0, 0)
+
+    ecc_lower = np.zeros(n)
+    ecc_upper = np.full(n, np.inf)
+    candidates = np.ones(n, dtype=bool)
+    degree = np.diff(L.indptr)
+    diameter_lower = 0.0
+    diameter_upper = np.inf
+    sweeps = 0
+
+    v = int(np.argmax(degree))
+    pick_upper = True
+    while candidates.any() and diameter_lower < diameter_upper:
+        distances = shortest_path(L, method='D', directed=False, unweighted=unweighted, indices=v)
+        sweeps += 1
+        eccentricity = distances.max()
+        farthest = int(np.argmax(distances))
+
+        # Update the bounds of the eccentricities
+        ecc_lower = np.maximum(ecc_lower, np.maximum(eccentricity - distances, distances))
+        ecc_upper = np.minimum(ecc_upper, eccentricity + distances)
+        ecc_lower[v] = ecc_upper[v] = eccentricity
+        diameter_lower = max(diameter_lower, ecc_lower.max())
+
+        # Discard vertices that can't have an eccentricity bigger than the diameter found so far
+        candidates &= ecc_upper > max(diameter_lower, lower)
+        candidates[v] = False
+        diameter_upper = max(diameter_lower, ecc_upper[candidates].max()) if candidates.any() else diameter_lower
+
+        if not exact:
+            if sweeps >= k:
+                break
+            # k-sweep: continue from the farthest vertex, if it was searched already use the bounds
+            if candidates[farthest]:
+                v = farthest
+                continue
+
+        # Alternate between the candidate with the biggest upper bound and the one with the smallest lower bound
+        if not candidates.any():
+            break
+        index = np.flatnonzero(candidates)
+        if pick_upper:
+            v = int(index[np.argmax(ecc_upper[index])])
+        else:
+            v = int(index[np.argmin(ecc_lower[index])])
+        pick_upper = not pick_upper
+
+    diameter_upper = min(diameter_upper, 2 * ecc_upper.min())
+    return Diameter(diameter_lower, diameter_lower, max(diameter_upper, diameter_lower), sweeps)
+
+#=========================================================================================================================
+def get_eccentricity_bounds(L: sp.csr_matrix, labels: np.ndarray, unweighted = True) -> np.ndarray:
+    """
+    Upper bound of the out eccentricity of every vertex of a directed graph, the longest shortest path to a vertex
+    that it reaches. Inside a strongly connected component C every path is at most (|C| - 1) times its longest edge,
+    and a vertex can't go further than the longest path to leave its component plus the bound of the component where
+    it lands. The bounds are computed on the condensation DAG, from the components without exits upwards, one level
+    of the DAG at a time.
+
+    Args:
+        L (csr_matrix): Length matrix of the directed graph, see get_length_matrix.
+        labels (ndarray): Strongly connected component of every vertex.
+        unweighted (bool): If True, every edge has length 1.
+
+    Returns:
+        ndarray: Upper bound of the out eccentricity of every vertex
+    """
+    n_components = labels.max() + 1 if len(labels) else 0
+    coo = L.tocoo()
+    a, b = labels[coo.row], labels[coo.col]
+    lengths = np.ones(len(coo.data)) if unweighted else coo.data.astype(float)
+    inside = a == b
+
+    # Bound of the paths inside each component
+    sizes = np.bincount(labels, minlength=n_components)
+    longest = np.zeros(n_components)
+    np.maximum.at(longest, a[inside], lengths[inside])
+    bound = (sizes - 1) * longest
+
+    # Edges between components, grouped by the component where they land
+    a, b, lengths = a[~inside], b[~inside], lengths[~inside]
+    order = np.argsort(b, kind='stable')
+    a, b, lengths = a[order], b[order], lengths[order]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(b, minlength=n_components))])
+
+    remaining = np.bincount(a, minlength=n_components)
+    exits = np.zeros(n_components)
+    upper = np.zeros(n_components)
+    frontier = np.flatnonzero(remaining == 0)
+    while len(frontier):
+        upper[frontier] = bound[frontier] + exits[frontier]
+
+        # Edges that land in the frontier, their components lose one pending exit
+        counts = indptr[frontier + 1] - indptr[frontier]
+        edges = np.repeat(indptr[frontier] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        np.maximum.at(exits, a[edges], lengths[edges] + upper[b[edges]])
+        remaining -= np.bincount(a[edges], minlength=n_components)
+        touched = np.unique(a[edges])
+        frontier = touched[remaining[touched] == 0]
+
+    return upper[labels]
+
+#=========================================================================================================================
+def directed_diameter(L: sp.csr_matrix, unweighted = True, exact = True, k = 4) -> Diameter:
+    """
+    Diameter of a directed graph: the longest shortest path u -> v among the pairs where v is reachable from u, the
+    same as running gt.pseudo_diameter from every vertex. It follows the bound pruning of DiFUB (Crescenzi et al.,
+    2013) for graphs that are not strongly connected. Every vertex keeps an upper bound of its out eccentricity,
+    first from the condensation DAG (see get_eccentricity_bounds). A forward and a backward search from v give
+    e(v) and, for every w in the strongly connected component of v, e(w) <= d(w,v) + e(v). The bounds are then
+    propagated to the vertices that reach them, e(w) <= max over the out edges w -> u of l(w,u) + e(u). Vertices
+    whose bound can't beat the diameter found so far are discarded.
+
+    The approximate mode stops after searching from k vertices and reports the largest remaining bound as the
+    upper bound of the diameter.
+
+    Args:
+        L (csr_matrix): Length matrix of the directed graph, see get_length_matrix.
+        unweighted (bool): If True, every edge has length 1 and BFS is used instead of Dijkstra.
+        exact (bool): If False, stop after searching from k vertices.
+        k (int): Number of vertices searched in the approximate mode.
+
+    Returns:
+        Diameter: The diameter of the graph and its bounds. sweeps counts the forward and the backward searches
+    """
+    n = L.shape[0]
+    out_degree = np.diff(L.indptr)
+    rows = np.flatnonzero(out_degree > 0)
+    if len(rows) == 0:
+        return Diameter(0.0, 0.0, 0.0, 0)
+
+    n_components, labels = connected_components(L, directed=True, connection='strong')
+    upper = get_eccentricity_bounds(L, labels, unweighted)
+    lengths = np.ones(L.nnz) if unweighted else L.data.astype(float)
+    LT = L.T.tocsr()
+
+    # First search from the vertex of highest degree of the biggest strongly connected component
+    degree = out_degree + np.diff(LT.indptr)
+    biggest = np.flatnonzero(labels == np.argmax(np.bincount(labels)))
+    v = int(biggest[np.argmax(degree[biggest])])
+
+    candidates = out_degree > 0
+    lower, searched = 0.0, 0
+    while True:
+        forward = shortest_path(L, method='D', directed=True, unweighted=unweighted, indices=v)
+        backward = shortest_path(LT, method='D', directed=True, unweighted=unweighted, indices=v)
+        searched += 1
+        eccentricity = float(forward[np.isfinite(forward)].max())
+        lower = max(lower, eccentricity, float(backward[np.isfinite(backward)].max()))
+
+        # Bounds of the component of v, then of the vertices that reach it
+        same = labels == labels[v]
+        upper[same] = np.minimum(upper[same], backward[same] + eccentricity)
+        upper[v] = eccentricity
+        while True:
+            bound = np.maximum.reduceat(lengths + upper[L.indices], L.indptr[rows])
+            tighter = bound < upper[rows]
+            if not tighter.any():
+                break
+            upper[rows[tighter]] = bound[tighter]
+
+        candidates[v] = False
+        candidates &= upper > lower
+        if not candidates.any() or (not exact and searched >= k):
+            break
+        index = np.flatnonzero(candidates)
+        v = int(index[np.argmax(upper[index])])
+
+        # Follow the out edges that give the bound of v, searching there tightens every vertex that goes through them
+        visited = {v}
+        while True:
+            edges = slice(L.indptr[v], L.indptr[v + 1])
+            through = lengths[edges] + upper[L.indices[edges]]
+            u = int(L.indices[edges][np.argmax(through)])
+            if through.max() < upper[v] or not candidates[u] or u in visited:
+                break
+            v = u
+            visited.add(v)
+
+    remaining = upper[candidates].max() if candidates.any() else lower
+    return Diameter(lower, lower, max(lower, float(remaining)), 2 * searched)
+
+#=========================================================================================================================
+def diameter(g: gt.Graph, weight = None, exact = True, k = 4, directed = False) -> Diameter:
+    """
+    Diameter of the graph, by default of its undirected version: the longest shortest path between two vertices of
+    the same connected component. Isolated vertices are skipped and the components are visited from the biggest to the
+    smallest, the ones that can't have a path longer than the diameter found so far are not searched.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        weight (String): The name of the EdgePropertyMap used as length, e.g. 'Normal Weight'. By default every
+            edge has length 1.
+        exact (bool): If True, the exact diameter. If False, the k-sweep approximation of every component with
+            its bounds.
+        k (int): Number of searches per component of the approximate mode.
+        directed (bool): If True, the paths follow the direction of the edges, see directed_diameter.
+
+    Returns:
+        Diameter: The diameter of the graph and its bounds
+    """
+    unweighted = weight is None
+    if directed:
+        return directed_diameter(get_length_matrix(g, weight, directed=True), unweighted, exact, k)
+
+    L = get_length_matrix(g, weight)
+    n_components, labels = connected_components(L, directed=False)
+    sizes = np.bincount(labels, minlength=n_components)
+
+    # Longest possible path of each component: every edge of a spanning tree with the longest length
+    order = np.argsort(labels, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    if unweighted:
+        bound = (sizes - 1).astype(float)
+    else:
+        coo = L.tocoo()
+        longest = np.zeros(n_components)
+        np.maximum.at(longest, labels[coo.row], coo.data)
+        bound = (sizes - 1) * longest
+
+    lower, upper, sweeps = 0.0, 0.0, 0
+    for label in np.argsort(-bound, kind='stable'):
+        if sizes[label] < 2 or bound[label] <= lower:
+            # Components are visited by decreasing bound, the rest can't beat the diameter
+            break
+        nodes = order[starts[label]:starts[label] + sizes[label]]
+        result = component_diameter(L[nodes][:, nodes], unweighted, exact, k, lower)
+        sweeps += result.sweeps
+        upper = max(upper, result.upper)
+        lower = max(lower, result.lower)
+
+    return Diameter(lower, lower, max(upper, lower), sweeps)
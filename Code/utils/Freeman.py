@@ -17,26 +17,11 @@ def Freeman_Classic(G: gt.Graph, types:str) -> float:
         type: Segregation Index of Freeman from one group against all the other groups using a
             weighted adjacency matrix
     """
-    g = G.copy()
-    if g.is_directed():
-        g.set_directed(False)
-    else:
-        pass      
-        
+    # Zero-copy undirected view of the graph
+    g = gt.GraphView(G, directed=False)
     M = get_contact_layer(g, property_label=types)
-    
-    cross_ties = M[0,1]
-    edges = g.num_edges()
-    nodes = g.num_vertices()
-    
-    P = cross_ties/edges
-    types_matrix = get_types_matrix(g, types = types)
-    
-    n_1 = np.sum(types_matrix[:, 0])
-    n_2 = np.sum(types_matrix[:, 1])
-    
-    Pi = (2*n_1*n_2)/(nodes * (nodes - 1))
-    return 1 - (P / Pi) 
+    sizes = get_types_encoding(g, types).sizes
+    return freeman_classic_from_layer(M, sizes, g.num_edges(), g.num_vertices())
 
 #=========================================================================================================================
 def Freeman_Groups(G: gt.Graph, types:str, group:str) -> float:
@@ -52,32 +37,17 @@ def Freeman_Groups(G: gt.Graph, types:str, group:str) -> float:
         type: Segregation Index of Freeman from one group against all the other groups
 
     """
-    g = G.copy()
-    # This Measure is for Undirected Graphs and Unweighted
-    if g.is_directed():
-        g.set_directed(False)
-    else:
-        pass 
+    # This Measure is for Undirected Graphs and Unweighted. Zero-copy undirected view of the graph
+    g = gt.GraphView(G, directed=False)
     
     # get important stuff
-    groups = get_types_index(g, types)
-    groups_list = get_types_dict(g, types=types)[group]
-    group_index = groups[group]
-    
-    # Calculate contact Matrix, me vs others
-    me_vs_others_matrix = me_vs_others(g, group_index, types)
-    
-    # Getting group sizes
-    total = g.num_vertices()
-    nodes_in_group = sum(groups_list)
-    nodes_out_group = g.num_vertices() - nodes_in_group
+    encoding = get_types_encoding(g, types)
+    group_index = encoding.index[group]
     
-    # Calculating P (Proportion of Between group edges)
-    P = me_vs_others_matrix[0,1] / np.sum(me_vs_others_matrix)
-    
-    # Calculating Pi (Expected Proportion of Between-group ties in random graph)
-    Pi = (2 * nodes_in_group * nodes_out_group) / (total * (total - 1))
-    return (Pi-P)/Pi
+    # Calculate contact Matrix and getting group sizes
+    M = get_contact_layer(g, types)
+    nodes_in_group = np.count_nonzero(encoding.codes == group_index)
+    return freeman_groups_from_layer(M, group_index, nodes_in_group, g.num_vertices())
 
 # =========================================================================================================================
 def Freeman_Global(G: gt.Graph, property_label:str) -> float:
@@ -92,33 +62,74 @@ def Freeman_Global(G: gt.Graph, property_label:str) -> float:
         type: Segregation Index of Freeman
 
     """
-    g = G.copy()
-    if G.is_directed():
-        g.set_directed(False)
-    else:
-        pass  
+    # Zero-copy undirected view of the graph
+    g = gt.GraphView(G, directed=False)
     
-    types_matrix = get_types_matrix(g, property_label)
+    encoding = get_types_encoding(g, property_label)
     M = get_contact_layer(g, property_label)
     
-    # We get the amount of vertices and groups
-    N, K = types_matrix.shape
-    
-    # Get the amount of nodes per group
-    n_k = []
-    for k in range(K):
-        n = np.sum(types_matrix[:, k])
-        n_k.append(n)
-    n_k = np.array(n_k)
-    
-    if g.is_directed():
-        g.set_directed(False)
-    else:
-        pass      
-    
-    M_up = np.triu(M,k=1)
-    between_edges = M_up.sum()
-    
+    return freeman_global_from_layer(M, encoding.sizes)
+
+#=========================================================================================================================
+def freeman_classic_from_layer(M: np.ndarray, sizes: np.ndarray, edges: int, nodes: int) -> float:
+    """
+    Classic Freeman Segregation Index from an already computed contact layer of an undirected graph.
+    Used by Freeman_Classic and by the single pass evaluator, that shares the contact layer between indexes.
+
+    Args:
+        M (ndarray): Contact layer of shape (2,2) of the undirected graph.
+        sizes (ndarray): Number of nodes of each group, in the order of the rows of M.
+        edges (int): Number of edges of the graph.
+        nodes (int): Number of nodes of the graph.
+
+    Returns:
+        type: Segregation Index of Freeman
+    """
+    P = M[0,1] / edges
+    Pi = (2 * sizes[0] * sizes[1]) / (nodes * (nodes - 1))
+    return 1 - (P / Pi)
+
+#=========================================================================================================================
+def freeman_groups_from_layer(M: np.ndarray, group_index: int, nodes_in_group: int, nodes: int) -> float:
+    """
+    Freeman Segregation Index of one group against all the other groups from an already computed contact layer
+    of an undirected graph. The cross ties of the me vs others matrix are read directly from the row and the
+    column of the group, so the (2,2) matrix is never built.
+
+    Args:
+        M (ndarray): Contact layer of shape (G,G) of the undirected graph.
+        group_index (int): index of the group in the contact layer.
+        nodes_in_group (int): Number of nodes of the group.
+        nodes (int): Number of nodes of the graph.
+
+    Returns:
+        type: Segregation Index of Freeman from one group against all the other groups
+    """
+    # Calculating P (Proportion of Between group edges)
+    cross_ties = M[group_index,:].sum() + M[:,group_index].sum() - 2 * M[group_index, group_index]
+    P = cross_ties / M.sum()
+
+    # Calculating Pi (Expected Proportion of Between-group ties in random graph)
+    nodes_out_group = nodes - nodes_in_group
+    Pi = (2 * nodes_in_group * nodes_out_group) / (nodes * (nodes - 1))
+    return (Pi-P)/Pi
+
+#=========================================================================================================================
+def freeman_global_from_layer(M: np.ndarray, n_k: np.ndarray) -> float:
+    """
+    Global Freeman Segregation Index for more than 2 groups from an already computed contact layer
+    of an undirected graph.
+
+    Args:
+        M (ndarray): Contact layer of shape (G,G) of the undirected graph.
+        n_k (ndarray): Number of nodes of each group, in the order of the rows of M.
+
+    Returns:
+        type: Segregation Index of Freeman
+    """
+    N = n_k.sum()
+    between_edges = np.triu(M, k=1).sum()
+
     # Calculate P 
     P = between_edges / M.sum()
 
@@ -128,5 +139,4 @@ def Freeman_Global(G: gt.Graph, property_label:str) -> float:
 
     # calculate using the formula
     S = 1 - (numerator / denominator)
-    
     return S
\ No newline at end of file
@@ -0,0 +1,97 @@
+import graph_tool.all as gt
+import numpy as np
+import pandas as pd
+
+# Color of each Political Affiliation
+COLOR = {
+    'Izquierda': 'blue',
+    'Derecha': 'red',
+    'Centro': 'green',
+    'Sin Clasificar': 'purple',
+    'NPD':'gray'
+}
+
+#=========================================================================================================================
+def get_vertex_template(master_id: pd.DataFrame, color = COLOR) -> gt.Graph:
+    """
+    Creates a graph without edges with one vertex for every user of the Master Index and the vertex properties that
+    are the same for every window: 'Political Label', 'User ID', 'Label', 'Color' and one bool PropertyMap for
+    each Political Affiliation. It is built once and copied for every graph.
+
+    Args:
+        master_id (DataFrame): Master Index with columns 'User ID', 'Label' and 'Political Affiliation'. Row i is vertex i.
+        color (dict): Color of each Political Affiliation.
+
+    Returns:
+        g (Graph): Graph with the static vertex properties
+    """
+    political_label = master_id['Political Affiliation'].to_numpy(dtype=str)
+
+    g = gt.Graph(directed=True)
+    g.add_vertex(len(master_id))
+
+    # Add Master Index Information
+    g.vp['Political Label'] = g.new_vertex_property('string', vals=political_label)
+    g.vp['User ID'] = g.new_vertex_property('int64_t', vals=master_id['User ID'].to_numpy(dtype=np.int64))
+    g.vp['Label'] = g.new_vertex_property('string', vals=master_id['Label'].to_numpy(dtype=str))
+    g.vp['Color'] = g.new_vertex_property('string', vals=[color[pa] for pa in political_label])
+
+    # Add dummy maps, one VertexPropertyMap for every Political Label
+    for cat in np.unique(political_label):
+        g.vp[cat] = g.new_vertex_property('bool', vals=political_label == cat)
+    return g
+
+#=========================================================================================================================
+def get_tweets_array(tweets_per_day: dict, user_id) -> np.ndarray:
+    """
+    Aligns the number of original tweets of each user with the vertices of the graph.
+
+    Args:
+        tweets_per_day (dict): Number of original tweets, keys are User IDs.
+        user_id (array): User ID of every vertex, in order.
+
+    Returns:
+        ndarray: Number of original tweets of every vertex. Users without information get 0.
+    """
+    return pd.Series(tweets_per_day, dtype=float).reindex(user_id, fill_value=0).to_numpy(dtype=np.int64)
+
+#=========================================================================================================================
+def build_graph(template: gt.Graph, edges: pd.DataFrame, tweets: np.ndarray, graph_properties: dict) -> gt.Graph:
+    """
+    Creates the retweet network of a window. The static vertex properties come from a copy of the template, the
+    edges and their properties are added with one add_edge_list call and the vertex properties of the window
+    ('Isolate' and 'Tweets') are assigned as arrays.
+
+    Args:
+        template (Graph): Graph made with get_vertex_template.
+        edges (DataFrame): Source-Target DataFrame with columns 'Source', 'Target', 'number_of_rts' and 'normal_weight'.
+        tweets (ndarray): Number of original tweets of every vertex, see get_tweets_array.
+        graph_properties (dict): String graph properties, e.g. {'Date': '2021-05-04'}
+
+    Returns:
+        g (Graph): The retweet network
+    """
+    g = template.copy()
+    N = g.num_vertices()
+
+    # Create Edge property maps and add all the edges
+    number_of_rts = g.new_edge_property('int')
+    normal_weight = g.new_edge_property('float')
+    edge_list = edges[['Source', 'Target', 'number_of_rts', 'normal_weight']].to_numpy(dtype=float)
+    g.add_edge_list(edge_list, eprops=[number_of_rts, normal_weight])
+    g.ep['Number of rts'] = number_of_rts
+    g.ep['Normal Weight'] = normal_weight
+
+    # Add isolated and tweets information of users
+    source = edges['Source'].to_numpy(dtype=np.int64)
+    target = edges['Target'].to_numpy(dtype=np.int64)
+    degree = np.bincount(source, minlength=N) + np.bincount(target, minlength=N)
+    g.vp['Isolate'] = g.new_vertex_property('bool', vals=degree == 0)
+    g.vp['Tweets'] = g.new_vertex_property('int64_t', vals=tweets)
+
+    # Add graph properties
+    for key, value in graph_properties.items():
+        graph_property = g.new_graph_property('string')
+        graph_property[g] = value
+        g.gp[key] = graph_property
+    return g
@@ -0,0 +1,71 @@
+import os
+import graph_tool.all as gt
+
+# Extension of the binary graph-tool format, much faster to load than GraphML
+CACHE_EXTENSION = '.gt'
+
+#=========================================================================================================================
+def get_cache_file(file: str) -> str:
+    """
+    Path of the binary cache of a graph, next to it: 'starting_2021-05-04.graphml' -> 'starting_2021-05-04.gt'
+
+    Args:
+        file (String): Path of the graph file.
+
+    Returns:
+        str: Path of the .gt file
+    """
+    return os.path.splitext(file)[0] + CACHE_EXTENSION
+
+#=========================================================================================================================
+def write_cache(g: gt.Graph, cache: str):
+    """
+    Writes the binary cache through a temporary file, so other processes never load a half written cache.
+
+    Args:
+        g (Graph): The Graph object to save.
+        cache (String): Path of the .gt file.
+    """
+    temporary = f'{cache}.{os.getpid()}.tmp'
+    g.save(temporary, fmt='gt')
+    os.replace(temporary, cache)
+
+#=========================================================================================================================
+def save_graph(g: gt.Graph, file: str):
+    """
+    Saves a graph in the given file and its binary cache, so the first load does not parse the GraphML.
+
+    Args:
+        g (Graph): The Graph object to save.
+        file (String): Path of the graph file, e.g. a .graphml file.
+    """
+    g.save(file)
+    cache = get_cache_file(file)
+    if cache != file:
+        write_cache(g, cache)
+
+#=========================================================================================================================
+def load_graph(file: str) -> gt.Graph:
+    """
+    Loads a graph from its binary cache if the cache is at least as recent as the file. Otherwise the file is
+    parsed and the cache is written for the next loads. If the cache cannot be written, the graph is just returned.
+
+    Args:
+        file (String): Path of the graph file, e.g. a .graphml file.
+
+    Returns:
+        g (Graph): The graph
+    """
+    cache = get_cache_file(file)
+    if cache == file:
+        return gt.load_graph(file)
+
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(file):
+        return gt.load_graph(cache)
+
+    g = gt.load_graph(file)
+    try:
+        write_cache(g, cache)
+    except OSError:
+        pass
+    return g
@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import pandas as pd
+import graph_tool.all as gt
+import concurrent.futures
+from tqdm import tqdm
+from utils.GraphCache import load_graph
+from utils.Segregation import get_graph_date
+from utils.Diameter import diameter
+import utils.WedgeSampling as Ws
+
+# Registry of the metrics: name -> function that takes a Graph and returns a list of (Statistic, Value, SE)
+METRICS = {}
+
+# Metrics computed by default. The sampled ones are registered but only used when asked for
+DEFAULT_METRICS = []
+
+# Number of wedges sampled by the sampled metrics
+CLUSTERING_SAMPLES = 100_000
+
+# Columns of the tidy table of statistics
+COLUMNS = ['File', 'Modified', 'Date', 'Metric', 'Statistic', 'Value', 'SE']
+
+# Value types of the EdgePropertyMaps that can be averaged
+NUMERIC_TYPES = ('bool', 'int16_t', 'int32_t', 'int64_t', 'double', 'long double')
+
+#=========================================================================================================================
+def register_metric(name: str, default = True):
+    """
+    Decorator that adds a function to the registry of metrics. The function takes a Graph and returns a list of
+    (Statistic, Value, SE) rows, SE is NaN when there is no standard error.
+
+    Args:
+        name (String): Name of the metric in the registry and in the cache.
+        default (bool): If True, the metric is computed by default by run_metrics.
+    """
+    def register(function):
+        METRICS[name] = function
+        if default and name not in DEFAULT_METRICS:
+            DEFAULT_METRICS.append(name)
+        return function
+    return register
+
+#=========================================================================================================================
+@register_metric('Average Degree')
+def average_degree(g: gt.Graph) -> list:
+    """Average in, out and total degree of the vertices."""
+    rows = []
+    for stat in ['in', 'out', 'total']:
+        value, se = gt.vertex_average(g, stat)
+        rows.append((f'Average Degree {stat}', value, se))
+    return rows
+
+@register_metric('Edge Averages')
+def edge_averages(g: gt.Graph) -> list:
+    """Average of every numeric EdgePropertyMap, the string ones can't be averaged."""
+    rows = []
+    for name, prop in g.ep.items():
+        if prop.value_type() in NUMERIC_TYPES:
+            value, se = gt.edge_average(g, prop)
+            rows.append((name, value, se))
+    return rows
+
+@register_metric('Global Clustering Coefficient')
+def global_clustering(g: gt.Graph) -> list:
+    """Global clustering coefficient weighted by 'Normal Weight'."""
+    value, se = gt.global_clustering(g, weight = g.ep['Normal Weight'])[:2]
+    return [('Global Clustering Coefficient', value, se)]
+
+@register_metric('Transitivity')
+def transitivity(g: gt.Graph) -> list:
+    """Global clustering coefficient without weights."""
+    value, se = gt.global_clustering(g)[:2]
+    return [('Transitivity', value, se)]
+
+@register_metric('Size')
+def size(g: gt.Graph) -> list:
+    """Number of isolated and non isolated vertices, edges, dyads and density."""
+    nodes = g.num_vertices()
+    isolate = g.vp['Isolate'].a.sum()
+    edges = g.num_edges()
+    return [
+        ('Non isolate Nodes', nodes - isolate, np.nan),
+        ('Isolate Nodes', isolate, np.nan),
+        ('Number of Edges', edges, np.nan),
+        ('Number of Dyads', edges / 2, np.nan),
+        ('Number of Density', (edges * 2) / (nodes * nodes - 1), np.nan)
+    ]
+
+@register_metric('Connected Components')
+def connected_components(g: gt.Graph) -> list:
+    """Number of strongly and weakly connected components, the histograms have one entry per component."""
+    _, SCC_sizes = gt.label_components(g, directed=True)
+    _, WCC_sizes = gt.label_components(g, directed=False)
+    return [
+        ('Strongly Connected Components', len(SCC_sizes), np.nan),
+        ('Weakly Connected Components', len(WCC_sizes), np.nan)
+    ]
+
+@register_metric('Diameter', default = False)
+def simple_diameter(g: gt.Graph) -> list:
+    """Exact diameter without weights following the direction of the edges, see utils.Diameter."""
+    return [('Diametro Simple', diameter(g, directed = True).value, np.nan)]
+
+#=========================================================================================================================
+def register_sampled_metrics(samples: int) -> dict:
+    """
+    Registers the version of the clustering metrics estimated with wedge sampling, not computed by default. The
+    number of samples is part of their names, so the cache never mixes results of different sample sizes.
+
+    Args:
+        samples (int): Number of sampled wedges.
+
+    Returns:
+        dict: Name of each exact metric -> name of its sampled version, with the same statistics
+    """
+    def sampled_global_clustering(g: gt.Graph) -> list:
+        """Global clustering coefficient weighted by 'Normal Weight', estimated with wedge sampling."""
+        value, se = Ws.global_clustering(g, weight = 'Normal Weight', samples = samples)
+        return [('Global Clustering Coefficient', value, se)]
+
+    def sampled_transitivity(g: gt.Graph) -> list:
+        """Global clustering coefficient without weights, estimated with wedge sampling."""
+        value, se = Ws.global_clustering(g, samples = samples)
+        return [('Transitivity', value, se)]
+
+    sampled = {
+        'Global Clustering Coefficient': f'Sampled Global Clustering Coefficient ({samples} wedges)',
+        'Transitivity': f'Sampled Transitivity ({samples} wedges)'
+    }
+    register_metric(sampled['Global Clustering Coefficient'], default = False)(sampled_global_clustering)
+    register_metric(sampled['Transitivity'], default = False)(sampled_transitivity)
+    return sampled
+
+# Sampled version of the metrics that count triangles with CLUSTERING_SAMPLES wedges
+SAMPLED_METRICS = register_sampled_metrics(CLUSTERING_SAMPLES)
+
+#=========================================================================================================================
+def evaluate_metrics(file: str, metrics: list) -> pd.DataFrame:
+    """
+    Calculates several metrics of a graph, loading it only once.
+
+    Args:
+        file (String): Path of the graph file.
+        metrics (list): Names of the metrics, keys of METRICS.
+
+    Returns:
+        DataFrame: Tidy DataFrame with columns COLUMNS, one row per statistic
+    """
+    g = load_graph(file)
+    modified = os.stat(file).st_mtime_ns
+    date = get_graph_date(file)
+    records = []
+    for metric in metrics:
+        for statistic, value, se in METRICS[metric](g):
+            records.append((file, modified, date, metric, statistic, float(value), float(se)))
+    return pd.DataFrame.from_records(records, columns=COLUMNS)
+
+#=========================================================================================================================
+def run_metrics(files: list, metrics = None, cache = None, max_workers = None) -> pd.DataFrame:
+    """
+    Calculates the metrics of many graphs in a ProcessPoolExecutor. Results are cached by file and metric: only the
+    metrics that are not in the cache, or whose graph changed since they were calculated, are computed again.
+
+    Args:
+        files (list): Paths of the graph files.
+        metrics (list): Names of the metrics, keys of METRICS. By default, DEFAULT_METRICS.
+        cache (String): Path of the csv file of the cache. By default, nothing is cached.
+        max_workers (int): Number of processes.
+
+    Returns:
+        DataFrame: Tidy DataFrame with columns COLUMNS, for the given files and metrics
+    """
+    metrics = list(DEFAULT_METRICS) if metrics is None else list(metrics)
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}. Available metrics are {list(METRICS)}")
+
+    if cache is not None and os.path.exists(cache):
+        cached = pd.read_csv(cache)
+    else:
+        cached = pd.DataFrame(columns=COLUMNS)
+
+    # Drop results of graphs that changed, then find the missing (file, metric) pairs
+    modified = {file: os.stat(file).st_mtime_ns for file in files}
+    stale = cached['File'].isin(modified) & (cached['Modified'] != cached['File'].map(modified))
+    cached = cached[~stale]
+    done = set(zip(cached['File'], cached['Metric']))
+    pending = {file: [metric for metric in metrics if (file, metric) not in done] for file in files}
+    pending = {file: missing for file, missing in pending.items() if missing}
+
+    frames = [cached]
+    if pending:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(evaluate_metrics, file, missing) for file, missing in pending.items()]
+            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc='Metrics'):
+                frames.append(future.result())
+
+    frames = [frame for frame in frames if not frame.empty]
+    results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    if cache is not None and pending:
+        results.to_csv(cache, index=False)
+
+    return results[results['File'].isin(files) & results['Metric'].isin(metrics)].reset_index(drop=True)
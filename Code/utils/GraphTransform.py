@@ -1,10 +1,58 @@
 import graph_tool.all as gt
 import networkx as nx
+import numpy as np
+import pandas as pd
+from utils.Bojanowski import get_types_encoding
+
+def get_property_values(prop, index, keys = None) -> list:
+    """
+    Gets the values of a PropertyMap for an array of vertex or edge indexes, as python objects. Scalar numeric
+    types are read in bulk from the array of the PropertyMap. Strings, vectors and python objects have no array,
+    so they are read through the vertex or edge descriptors. Vectors are returned as lists.
+
+    Args:
+        prop (PropertyMap): The vertex or edge PropertyMap.
+        index (ndarray): Indexes of the vertices or edges.
+        keys (list): Descriptors of the vertices or edges in the order of index, see get_descriptors. Pass them
+            when reading several properties, so they are built only once. By default, built from the graph.
+
+    Returns:
+        list: Value of the PropertyMap for every index
+    """
+    value_type = prop.value_type()
+    if prop.a is not None:
+        values = prop.a[index]
+        if value_type == 'bool':
+            values = values.astype(bool)
+        return values.tolist()
+
+    if keys is None:
+        keys = get_descriptors(prop.get_graph(), index, prop.key_type())
+    if value_type.startswith('vector'):
+        return [list(prop[key]) for key in keys]
+    return [prop[key] for key in keys]
+
+def get_descriptors(g: gt.Graph, index, key_type: str) -> list:
+    """
+    Gets the vertex or edge descriptors for an array of indexes, with a single pass over the vertices or edges.
+
+    Args:
+        g (graph-tool Graph): The Graph object.
+        index (ndarray): Indexes of the vertices or edges.
+        key_type (String): 'v' for vertices and 'e' for edges.
+
+    Returns:
+        list: The descriptor of every index
+    """
+    if key_type == 'v':
+        return [g.vertex(i) for i in index]
+    edges = {int(g.edge_index[e]): e for e in g.edges()}
+    return [edges[i] for i in index]
 
 def to_networkx(g: gt.Graph) -> nx.Graph:
     """
     Based on an instance of a Graph class from graph-tool library. creates a new graph using the NetworkX framework
-    preserving all nodes, edges and graph attributes.
+    preserving all nodes, edges and graph attributes. Properties are read in bulk from the arrays of the PropertyMaps.
 
     Args:
         g (graph-tool Graph): The Graph object to transform
@@ -18,16 +66,25 @@ def to_networkx(g: gt.Graph) -> nx.Graph:
         nx_graph = nx.Graph()
 
     # Add nodes with their properties to the NetworkX graph
-    for v in g.vertices():
-        node_properties = {prop_name: g.vp[prop_name][v] for prop_name in g.vp}
-        nx_graph.add_node(int(v), **node_properties)
+    vertices = g.get_vertices()
+    names = list(g.vp.keys())
+    # Descriptors are only needed for properties without array, and are built once for all of them
+    keys = get_descriptors(g, vertices, 'v') if any(g.vp[name].a is None for name in names) else None
+    columns = [get_property_values(g.vp[name], vertices, keys) for name in names]
+    node_properties = [dict(zip(names, values)) for values in zip(*columns)] if names else [{}] * len(vertices)
+    nx_graph.add_nodes_from(zip(vertices.tolist(), node_properties))
 
     # Add edges with their properties to the NetworkX graph
-    for e in g.edges():
-        edge_properties = {prop_name: g.ep[prop_name][e] for prop_name in g.ep}
-        nx_graph.add_edge(int(e.source()), int(e.target()), **edge_properties)
+    edges = g.get_edges([g.edge_index])
+    names = list(g.ep.keys())
+    keys = get_descriptors(g, edges[:, 2], 'e') if any(g.ep[name].a is None for name in names) else None
+    columns = [get_property_values(g.ep[name], edges[:, 2], keys) for name in names]
+    edge_properties = [dict(zip(names, values)) for values in zip(*columns)] if names else [{}] * len(edges)
+    nx_graph.add_edges_from(zip(edges[:, 0].tolist(), edges[:, 1].tolist(), edge_properties))
     
     for key, value in dict(g.gp).items():
+        if g.properties[('g', key)].value_type().startswith('vector'):
+            value = list(value)
         nx_graph.graph[key] = value
     
     return nx_graph
@@ -37,22 +94,40 @@ def infer_property_type(value):
     Infers the graph-tool property type based on the value's Python type.
     Adjust or extend the type mappings as needed.
     """
-    if isinstance(value, bool):
+    if isinstance(value, (bool, np.bool_)):
         return "bool"
-    elif isinstance(value, int):
-        return "int"
-    elif isinstance(value, float):
+    elif isinstance(value, (int, np.integer)):
+        return "int64_t"
+    elif isinstance(value, (float, np.floating)):
         return "double"
     elif isinstance(value, str):
         return "string"
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        # Vectors take the type of their first element, and are vectors of doubles if they are empty
+        element_type = infer_property_type(value[0]) if len(value) > 0 else "double"
+        if element_type in ("bool", "int64_t", "double", "string"):
+            return f"vector<{element_type}>"
+        return "object"
     else:
-        # Default to string for types not explicitly handled
-        return "string"
+        # Default to python object for types not explicitly handled
+        return "object"
+
+def infer_values_type(values):
+    """
+    Infers the graph-tool property type of a list of values. The type is inferred from the first value, or from
+    the first non empty vector if the values are vectors.
+    """
+    for value in values:
+        if not isinstance(value, (list, tuple, np.ndarray)) or len(value) > 0:
+            return infer_property_type(value)
+    return infer_property_type(values[0])
 
 def to_graphtool(G):
     """
     Based on an instance of a Graph class from NetwrokX library. creates a new graph using the graph-tool framework
-    preserving all nodes, edges and graph attributes.
+    preserving all nodes, edges and graph attributes. Vertices and edges are added with one add_edge_list call and
+    the properties are created from their whole list of values. The type of each property is inferred from the
+    values of every node or edge (see infer_values_type).
 
     Args:
         g (NetworkX Graph): The Graph object to transform
@@ -63,28 +138,27 @@ def to_graphtool(G):
     g = gt.Graph(directed=G.is_directed())
 
     # Add all vertices
-    gt_vertices = {}
-    for nx_node in G.nodes():
-        v = g.add_vertex()
-        gt_vertices[nx_node] = v
-
-    # Add all edges
-    for edge in G.edges():
-        g.add_edge(gt_vertices[edge[0]], gt_vertices[edge[1]])
+    nodes = list(G.nodes(data=True))
+    node_index = pd.Index([node for node, _ in nodes])
+    if nodes:
+        g.add_vertex(len(nodes))
+
+    # Add all edges, in the same order as G.edges(). Edge i of the new graph is edge i of G
+    edges = list(G.edges(data=True))
+    if edges:
+        source = node_index.get_indexer([edge[0] for edge in edges])
+        target = node_index.get_indexer([edge[1] for edge in edges])
+        g.add_edge_list(np.column_stack([source, target]))
     
-    if len(list(G.nodes(data=True))[0]) > 1:
-        for vp, val in list(G.nodes(data=True))[0][1].items():
-            vprop = g.new_vertex_property(infer_property_type(val))
-            for n in G.nodes(data=True):
-                vprop[n[0]] = n[1][vp]
-            g.vp[vp] = vprop
+    if nodes and len(nodes[0][1]) > 0:
+        for vp in nodes[0][1]:
+            values = [data[vp] for _, data in nodes]
+            g.vp[vp] = g.new_vertex_property(infer_values_type(values), vals=values)
     
-    if len(list(G.edges(data=True))[0]) > 2:
-        for ep, val in list(G.edges(data=True))[0][2].items():
-            eprop = g.new_edge_property(infer_property_type(val))
-            for e in list(G.edges(data=True)):
-                eprop[(e[0],e[1])] = e[2][ep]
-            g.ep[ep] = eprop
+    if edges and len(edges[0][2]) > 0:
+        for ep in edges[0][2]:
+            values = [data[ep] for _, _, data in edges]
+            g.ep[ep] = g.new_edge_property(infer_values_type(values), vals=values)
     
     if len(G.graph) > 0:
         for key, val in G.graph.items():
@@ -94,35 +168,66 @@ def to_graphtool(G):
     
     return g
 
-def get_normal_weight(g:gt.Graph, categories:list,copy=False,nombre = None):
+def get_normal_weights(g:gt.Graph, subsets:dict, copy=False):
     """
-    Calculates the normal weights of the graph in case the nodes are filtered
-    
+    Calculates the normal weights of the graph for several filters of the nodes at once. For each subset of
+    categories, only the edges with both nodes in the categories are kept and the 'Number of rts' of each edge is
+    divided by the sum of the 'Number of rts' of the kept edges of its source. Other edges get 0.
+    The edges and the 'Political Label' encoding are read once and shared by all the subsets.
+
+    Args:
+        g (Graph): The Graph object.
+        subsets (dict): Keys are the names of the new EdgePropertyMaps and values the lists of categories to keep.
+        copy (bool): If True, the properties are added to a copy of the graph.
+
+    Returns:
+        g (Graph): The graph with one new EdgePropertyMap for every subset
     """
     if copy:
         g = g.copy()
-    
-    g_filter = gt.GraphView(g,vfilt=lambda x: g.vp['Political Label'][x] in categories)
-    
-    # Crear un nuevo EdgePropertyMap para los valores normalizados
-    normal_weight = g.new_edge_property("float")
-
-    # Iterar sobre todos los bordes
-    for e in g_filter.edges():
-        source = e.source()
-        
-        # Calcular la suma de los pesos de los bordes conectados al nodo fuente
-        sum_rts = sum(g_filter.ep['Number of rts'][e_out] for e_out in source.out_edges())
-        
-        # Calcular el nuevo valor normalizado
-        if sum_rts > 0:
-            normal_weight[e] = g_filter.ep['Number of rts'][e] / sum_rts
-        else:
-            normal_weight[e] = 0  # O cualquier otro valor predeterminado
 
+    encoding = get_types_encoding(g, 'Political Label')
+    groups = encoding.groups.astype(str)
+    N = len(encoding.codes)
+
+    edges = g.get_edges([g.edge_index])
+    source, target, index = edges[:, 0], edges[:, 1], edges[:, 2]
+    rts = np.asarray(g.ep['Number of rts'].a, dtype=float)[index]
+
+    for nombre, categories in subsets.items():
+        # Aristas con ambos nodos en las categorías
+        in_categories = np.isin(groups, list(categories))[encoding.codes]
+        keep = in_categories[source] & in_categories[target]
+
+        # Suma de los rts de las aristas que salen de cada nodo
+        sum_rts = np.bincount(source[keep], weights=rts[keep], minlength=N)
+        if not g.is_directed():
+            # In undirected graphs the out edges of a node also include the edges where it is the target
+            other_end = keep & (source != target)
+            sum_rts += np.bincount(target[other_end], weights=rts[other_end], minlength=N)
+
+        # Crear un nuevo EdgePropertyMap para los valores normalizados
+        normal_weight = g.new_edge_property("float")
+        total = sum_rts[source[keep]]
+        normal_weight.a[index[keep]] = np.divide(rts[keep], total, out=np.zeros(len(total)), where=total > 0)
+        g.ep[nombre] = normal_weight
+
+    return g
+
+def get_normal_weight(g:gt.Graph, categories:list,copy=False,nombre = None):
+    """
+    Calculates the normal weights of the graph in case the nodes are filtered. See get_normal_weights.
+
+    Args:
+        g (Graph): The Graph object.
+        categories (list): Categories of 'Political Label' of the nodes to keep.
+        copy (bool): If True, the property is added to a copy of the graph.
+        nombre (String): Name of the new EdgePropertyMap. By default, made of the first letters of the categories.
+
+    Returns:
+        g (Graph): The graph with the new EdgePropertyMap
+    """
     if not nombre:
         nombre = '_'.join(palabra[:2] for palabra in map(lambda x: x.replace(' ', ''), categories))
-        
-    g.ep[nombre] = normal_weight
 
-    return g
\ No newline at end of file
+    return get_normal_weights(g, {nombre: categories}, copy=copy)
\ No newline at end of file
@@ -1,51 +1,50 @@
 import graph_tool.all as gt
 import numpy as np
-import pandas as pd
+from utils.Bojanowski import *
 
 #=========================================================================================================================
-def homophily_index(graph: gt.Graph, property_name: str) -> dict:
+def homophily_index(graph: gt.Graph, property_name: str, weights = None) -> dict:
     """
-    Calculates the homiphily Index
+    Calculates the homiphily Index for all the groups at once with one bincount over the encoded (source, target)
+    pairs of the edges. If weights are provided, the edges count by their weight (weighted homophily).
 
     Args:
         g (Graph): The Graph object to analize.
         property_name (String): The name of the PropertyMap where the tipification of the nodes groups resides.
+        weights (String): The name of the EdgePropertyMap where the weights of the edges resides.
 
     Returns:
-        type: dict with somethings XD
+        type: dict with the dicts "w_i", "s_i", "d_i", "H_i" and "IH_i". Each one has the groups as keys.
+        Groups without out edges get NaN in H_i and IH_i.
     """
-    prop_map = graph.vp[property_name]
-
-    # Extraigamos las categorías disponibles
-    labels = [prop_map[v] for v in graph.vertices()]
-    categorias = np.unique(labels)
-    # Contemos cuantos nodos tenemos
-    N = len(labels)
-
-    # Extraigamos todos los tipos de enlaces
-    edges_data = []
-    for e in graph.edges():
-        source_type = prop_map[e.source()]
-        target_type = prop_map[e.target()]
-        edges_data.append((source_type, target_type))
-
-    enlaces = pd.DataFrame(edges_data, columns = ["Source", "Target"])
-
-
-    w_i = dict()
-    s_i = dict()
-    d_i = dict()
-    H_i = dict()
-    IH_i = dict()
-    for c in categorias:
-        # Calculate w_i
-        w_i[c] = labels.count(c)/N
-        # Calculate s_i and d_i 
-        s_i[c] = enlaces[(enlaces["Source"] == c) & (enlaces["Target"] == c)].shape[0]/enlaces.shape[0]
-        d_i[c] = enlaces[(enlaces["Source"] == c) & (enlaces["Target"] != c)].shape[0]/enlaces.shape[0]
+    encoding = get_types_encoding(graph, property_name)
+    K = len(encoding.groups)
+
+    # Extraigamos las categorías disponibles y contemos cuantos nodos tenemos
+    vertices = graph.get_vertices()
+    n = np.bincount(encoding.codes[vertices], minlength=K)
+    categorias = np.flatnonzero(n)
+    N = len(vertices)
+
+    # Contemos los enlaces entre cada par de categorías
+    edges = graph.get_edges([graph.edge_index])
+    source, target = encoding.codes[edges[:, 0]], encoding.codes[edges[:, 1]]
+    w = None
+    if weights is not None:
+        w = np.asarray(graph.ep[weights].a, dtype=float)[edges[:, 2]]
+    enlaces = np.bincount(source * K + target, weights=w, minlength=K * K).reshape(K, K)
+    total = enlaces.sum()
+    within = np.diag(enlaces)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate w_i, s_i and d_i
+        w_i = n / N
+        s_i = within / total
+        d_i = (enlaces.sum(axis=1) - within) / total
         # Calculate Homophily index
-        H_i[c] = s_i[c]/(s_i[c] + d_i[c])
+        H_i = s_i / (s_i + d_i)
         # Calculate Coleman's inbreeding Homophily Index
-        IH_i[c] = (H_i[c] - w_i[c])/(1 - w_i[c])
+        IH_i = (H_i - w_i) / (1 - w_i)
 
-    return {"w_i": w_i, "s_i": s_i, "d_i": d_i, "H_i": H_i, "IH_i": IH_i}
\ No newline at end of file
+    indexes = {"w_i": w_i, "s_i": s_i, "d_i": d_i, "H_i": H_i, "IH_i": IH_i}
+    return {name: {encoding.groups[c]: float(values[c]) for c in categorias} for name, values in indexes.items()}
\ No newline at end of file
@@ -1,5 +1,62 @@
 from utils.Bojanowski import * 
 import graph_tool.all as gt
+import scipy.sparse as sp
+import weakref
+
+# Individual proximities already computed, by graph, weights and property name
+_individual_cache = weakref.WeakKeyDictionary()
+
+# ========================================================================================
+def individual_proximity_matrix(G: gt.Graph, weights:str, property_label:str):
+    """
+     Individual Proximity Index for every vertex at once: the weight that each individual puts on each group
+     and on the groups different from its own. It is a single sparse product A·T of the weighted adjacency
+     and the types matrix. The result is cached for the graph, so the per vertex functions are lookups.
+
+     W_jk
+    Args:
+        G (Graph): The Graph object to analize.
+        weights (String): The name of the EdgePropertyMap where the weights of the edges resides
+        property_label (String): The name of the PropertyMap where the tipification of the nodes groups resides.
+    Returns:
+        W_jk (ndarray): Matrix of shape (N,G), columns follow get_types_index(G, property_label).
+        W_j_others (ndarray): Array of shape (N,), weight put on groups different from the 'Political Label' of the node.
+        Isolated nodes get NaN in both.
+    """
+    encoding = get_types_encoding(G, property_label)
+    weight_map = G.ep[weights]
+    cache = _individual_cache.setdefault(G, {})
+    key = (weights, property_label)
+    if key in cache and cache[key][0] is weight_map and cache[key][1] is encoding:
+        return cache[key][2]
+
+    N, K = len(encoding.codes), len(encoding.groups)
+    edges = G.get_edges([G.edge_index])
+    source, target = edges[:, 0], edges[:, 1]
+    w = np.asarray(weight_map.a, dtype=float)[edges[:, 2]]
+    if not G.is_directed():
+        # Out edges of undirected graphs go both ways
+        loops = source == target
+        source, target = np.concatenate([source, target[~loops]]), np.concatenate([target, source[~loops]])
+        w = np.concatenate([w, w[~loops]])
+
+    A = sp.csr_matrix((w, (source, target)), shape=(N, N))
+    T = sp.csr_matrix((np.ones(N), (np.arange(N), encoding.codes)), shape=(N, K))
+    W_jk = (A @ T).toarray()
+
+    # Own group of each node, in the columns of W_jk (-1 if it is not one of them)
+    labels = get_types_encoding(G, 'Political Label')
+    own_column = np.array([encoding.index.get(str(label), -1) for label in labels.groups])[labels.codes]
+    W_j_others = W_jk.sum(axis=1)
+    has_column = own_column >= 0
+    W_j_others[has_column] -= W_jk[has_column, own_column[has_column]]
+
+    isolate = np.asarray(G.vp['Isolate'].a, dtype=bool)
+    W_jk[isolate] = np.nan
+    W_j_others[isolate] = np.nan
+
+    cache[key] = (weight_map, encoding, (W_jk, W_j_others))
+    return W_jk, W_j_others
 
 # ========================================================================================
 def individual_proximity_to_h(G: gt.Graph, vertex:int,weights:str, property_label:str, group:str, in_proximity = True): 
@@ -16,18 +73,14 @@ def individual_proximity_to_h(G: gt.Graph, vertex:int,weights:str, property_labe
     Returns:
         index (float): The Proximity Index 
     """
-    individual_weight = 0
-    if isinstance(vertex,gt.Vertex):
-        pass
-    else:
-        v = G.vertex(vertex)
+    W_jk, _ = individual_proximity_matrix(G, weights, property_label)
+    index = get_types_index(G, property_label)
+    v = int(vertex)
     if G.vp['Isolate'][v]:
         return np.nan
-    for e in v.out_edges():
-        if G.vp[property_label][e.target()] == group:
-            individual_weight += G.ep[weights][e]
-    
-    return individual_weight
+    if group not in index:
+        return 0
+    return W_jk[v, index[group]]
 
 # ========================================================================================
 def individual_proximity_to_others(G: gt.Graph, vertex:int, weights:str, property_label:str, in_proximity = True): 
@@ -45,19 +98,93 @@ def individual_proximity_to_others(G: gt.Graph, vertex:int, weights:str, propert
     Returns:
         index (float): The Proximity Index 
     """
-    individual_weight = 0
-    if isinstance(vertex, gt.Vertex):
-        pass
-    else:
-        v = G.vertex(vertex)
-    if G.vp['Isolate'][v]:
-        return np.nan
-    for e in v.out_edges():
-        group = G.vp['Political Label'][v]
-        if G.vp[property_label][e.target()] != group:
-            individual_weight += G.ep[weights][e]
-    
-    return individual_weight
+    _, W_j_others = individual_proximity_matrix(G, weights, property_label)
+    return W_j_others[int(vertex)]
+
+# ========================================================================================
+def group_weight_matrix(G: gt.Graph, property_label:str, weights:str):
+    """
+    Sums the weights of the edges between every pair of groups and counts the active nodes of every group
+    (nodes with at least one out edge). It is one pass over G.get_edges() with np.bincount.
+
+    Args:
+        G (Graph): The Graph object to analize.
+        property_label (String): The name of the PropertyMap where the tipification of the nodes groups resides.
+        weights (String): The name of the EdgePropertyMap where the weights of the edges resides
+
+    Returns:
+        W (ndarray): Matrix of shape (G,G). W[g, h] is the sum of the weights of the edges from group g to group h.
+        active (ndarray): Array of shape (G,) with the number of active nodes of each group.
+        Rows and columns follow get_types_index(G, property_label).
+    """
+    encoding = get_types_encoding(G, property_label)
+    K = len(encoding.groups)
+    codes = encoding.codes
+
+    edges = G.get_edges([G.edge_index])
+    source, target = edges[:, 0], edges[:, 1]
+    w = np.asarray(G.ep[weights].a, dtype=float)[edges[:, 2]]
+
+    W = np.bincount(codes[source] * K + codes[target], weights=w, minlength=K * K).reshape(K, K)
+    active = np.bincount(codes[np.unique(source)], minlength=K)
+    return W, active
+
+# ========================================================================================
+def proximity_matrices(G: gt.Graph, property_label:str, weights:str) -> dict:
+    """
+    Proximity Index between every pair of groups and from every group to all other groups, in both directions.
+    Replaces the G^2 calls to proximity_g_h and proximity_g_others with a single pass over the edges.
+
+    Args:
+        G (Graph): The Graph object to analize.
+        property_label (String): The name of the PropertyMap where the tipification of the nodes groups resides.
+        weights (String): The name of the EdgePropertyMap where the weights of the edges resides
+
+    Returns:
+        dict: Rows and columns follow get_types_index(G, property_label). Groups without active nodes get NaN.
+            - 'In' (ndarray): (G,G) matrix, entry [g, h] is proximity_g_h(g, h, in_proximity=True)
+            - 'Out' (ndarray): (G,G) matrix, entry [g, h] is proximity_g_h(g, h, in_proximity=False)
+            - 'In Others' (ndarray): (G,) array, entry [g] is proximity_g_others(g, in_proximity=True)
+            - 'Out Others' (ndarray): (G,) array, entry [g] is proximity_g_others(g, in_proximity=False)
+    """
+    W, active = group_weight_matrix(G, property_label, weights)
+    within = np.diag(W)
+
+    def per_active(x: np.ndarray) -> np.ndarray:
+        # Divides every row by the active nodes of its group, NaN where there are none
+        scale = active.reshape((-1,) + (1,) * (x.ndim - 1))
+        return np.divide(x, scale, out=np.full(x.shape, np.nan), where=scale > 0)
+
+    return {
+        'In': per_active(W),
+        'Out': per_active(W.T),
+        'In Others': per_active(W.sum(axis=1) - within),
+        'Out Others': per_active(W.sum(axis=0) - within)
+    }
+
+# ========================================================================================
+def at_random_scenarios(G: gt.Graph, property_label:str) -> dict:
+    """
+    Random scenario (denominator of the proximity index) for every group at once. See at_random_scenario.
+
+    Args:
+        G (Graph): The Graph object to analize.
+        property_label (String): The name of the PropertyMap where the tipification of the nodes groups resides.
+
+    Returns:
+        dict: 'Proximity to Group' and 'Proximity to Others', each an array of shape (G,) that follows
+            get_types_index(G, property_label).
+    """
+    encoding = get_types_encoding(G, property_label)
+    vertices = G.get_vertices()
+    tweets = np.asarray(G.vp['Tweets'].a, dtype=float)[vertices]
+
+    tweets_group = np.bincount(encoding.codes[vertices], weights=tweets, minlength=len(encoding.groups))
+    total = tweets.sum()
+    return {
+        'Proximity to Group': tweets_group / total,
+        'Proximity to Others': (total - tweets_group) / total
+    }
 
 # ========================================================================================
 def proximity_g_others(G: gt.Graph, property_label:str, weights:str, g:str, in_proximity=True):
@@ -75,20 +202,14 @@ def proximity_g_others(G: gt.Graph, property_label:str, weights:str, g:str, in_p
     Returns:
         index (float): The Proximity Index 
     """
-    active_nodes = set()
-    sum_weight = 0
-    for e in G.edges():
-        if G.vp[property_label][e.source()] == g:
-            active_nodes.add(int(e.source()))
-        if in_proximity:
-            if G.vp[property_label][e.source()] == g and G.vp[property_label][e.target()] != g:
-                sum_weight += G.ep[weights][e]
-        else:
-            if G.vp[property_label][e.source()] != g and G.vp[property_label][e.target()] == g:
-                sum_weight += G.ep[weights][e]
-    N_active_nodes = len(active_nodes)
-
-    return sum_weight/N_active_nodes
+    P = proximity_matrices(G, property_label, weights)
+    index = get_types_index(G, property_label)
+    if g not in index:
+        return np.nan
+    if in_proximity:
+        return P['In Others'][index[g]]
+    else:
+        return P['Out Others'][index[g]]
 
 #=========================================================================================================================
 def proximity_g_h(G, property_label:str, weights:str, g:str, h:str, in_proximity = True):
@@ -108,20 +229,16 @@ def proximity_g_h(G, property_label:str, weights:str, g:str, h:str, in_proximity
     Returns:
         index (float): The Proximity Index 
     """
-    active_nodes = set()
-    sum_weight = 0
-    for e in G.edges():
-        if G.vp[property_label][e.source()] == g:
-            active_nodes.add(int(e.source()))
-        if in_proximity:
-            if G.vp[property_label][e.source()] == g and G.vp[property_label][e.target()] == h:
-                sum_weight += G.ep[weights][e]
-        else:
-            if G.vp[property_label][e.source()] == h and G.vp[property_label][e.target()] == g:
-                sum_weight += G.ep[weights][e]
-    N_active_nodes = len(active_nodes)
-    
-    return sum_weight/N_active_nodes
+    P = proximity_matrices(G, property_label, weights)
+    index = get_types_index(G, property_label)
+    if g not in index:
+        return np.nan
+    if h not in index:
+        return 0.0
+    if in_proximity:
+        return P['In'][index[g], index[h]]
+    else:
+        return P['Out'][index[g], index[h]]
 
 #=========================================================================================================================
 def at_random_scenario(G:gt.Graph, property_label:str, group:str, use_case:str):
@@ -141,17 +258,11 @@ def at_random_scenario(G:gt.Graph, property_label:str, group:str, use_case:str):
     Returns:
         index (float): Denominator for proximity Index 
     """
-    tweets_numerador = 0 
-    tweets = 0
-    for v in G.vertices():
-        tweets += (G.vp['Tweets'][v])
-        # Condicional para índice de atención a otros. Cuenta Tweets del grupo (-g)
-        if use_case == 'Proximity to Others':
-            if G.vp[property_label][v] != group:
-                tweets_numerador += (G.vp['Tweets'][v])
-        # Condicional para índice de atención a cierto grupo h. Cuenta Tweets del grupo (h)
-        elif use_case == 'Proximity to Group':
-            if G.vp[property_label][v] == group:
-                tweets_numerador += (G.vp['Tweets'][v])
-        
-    return tweets_numerador/tweets
\ No newline at end of file
+    scenarios = at_random_scenarios(G, property_label)
+    index = get_types_index(G, property_label)
+    if use_case not in scenarios:
+        return 0.0
+    if group in index:
+        return scenarios[use_case][index[group]]
+    # Nobody belongs to the group
+    return 0.0 if use_case == 'Proximity to Group' else 1.0
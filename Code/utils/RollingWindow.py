@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import NamedTuple
+from utils.UserIndex import get_user_index, encode_users
+
+class DailyCounts(NamedTuple):
+    """
+    Retweets and original tweets of every day, indexed by the vertices of the Master Index.
+
+    Attributes:
+        dates (DatetimeIndex): Every day from the first to the last day, in order.
+        retweets (list): One csr_matrix of shape (N,N) per day. Entry (i, j) is the number of retweets of i to j.
+        tweets (csr_matrix): Sparse matrix of shape (D,N). Entry (d, i) is the number of original tweets of i on day d.
+    """
+    dates: pd.DatetimeIndex
+    retweets: list
+    tweets: sp.csr_matrix
+
+#=========================================================================================================================
+def get_daily_counts(retweets: pd.DataFrame, original: pd.DataFrame, master_id: pd.DataFrame, dates = None) -> DailyCounts:
+    """
+    Counts the retweets between every pair of users and the original tweets of every user for each day.
+    Every retweet and every tweet is grouped only once, windows of any length are made from these counts.
+
+    Args:
+        retweets (DataFrame): Retweets with columns 'Date', 'Author ID' and 'Referenced Tweet Author ID'.
+        original (DataFrame): Original tweets with columns 'Date' and 'Author ID'.
+        master_id (DataFrame): Master Index with column 'User ID'. Row i is vertex i.
+        dates (DatetimeIndex): Days to count. By default, every day from the first to the last retweet.
+
+    Returns:
+        DailyCounts: dates, retweets and tweets of every day. Users that are not in the Master Index are left out.
+    """
+    user_index = get_user_index(master_id['User ID'])
+    N = len(user_index.user_id)
+    if dates is None:
+        dates = pd.date_range(start = min(retweets['Date']), end = max(retweets['Date']), freq = 'D')
+    day_index = pd.Index(dates.date)
+
+    # Retweets per day, as integer codes. Users are interned with the Master Index
+    day = day_index.get_indexer(retweets['Date'])
+    source = encode_users(user_index, retweets['Author ID'])
+    target = encode_users(user_index, retweets['Referenced Tweet Author ID'])
+    keep = (day >= 0) & (source >= 0) & (target >= 0)
+    day, source, target = day[keep], source[keep], target[keep]
+
+    # One sparse matrix per day, repeated pairs are summed
+    order = np.argsort(day, kind='stable')
+    bounds = np.searchsorted(day[order], np.arange(len(dates) + 1))
+    daily_retweets = []
+    for d in range(len(dates)):
+        rows = order[bounds[d]:bounds[d + 1]]
+        counts = sp.csr_matrix((np.ones(len(rows), dtype=np.int64), (source[rows], target[rows])), shape=(N, N))
+        counts.sum_duplicates()
+        daily_retweets.append(counts)
+
+    # Original tweets per day, sparse since most users don't tweet every day. Repeated (day, user) pairs are summed
+    day = day_index.get_indexer(original['Date'])
+    author = encode_users(user_index, original['Author ID'])
+    keep = (day >= 0) & (author >= 0)
+    tweets = sp.csr_matrix((np.ones(keep.sum(), dtype=np.int64), (day[keep], author[keep])), shape=(len(dates), N))
+    tweets.sum_duplicates()
+
+    return DailyCounts(dates, daily_retweets, tweets)
+
+#=========================================================================================================================
+def rolling_windows(counts: DailyCounts, sizes = (1, 3)):
+    """
+    Rolling windows of several lengths in one pass over the days. Each window is updated by adding the new day and
+    subtracting the day that leaves the window, instead of grouping all its days again.
+
+    Args:
+        counts (DailyCounts): Counts of every day, see get_daily_counts.
+        sizes (list): Lengths of the windows in days.
+
+    Yields:
+        tuple: (size, starting date, retweets, tweets) for every window that fits in the days. retweets is a
+        csr_matrix of shape (N,N) and tweets an array of shape (N,), both summed over the days of the window. Only
+        the tweets of the yielded window are dense, the days and the running windows are kept sparse.
+    """
+    N = counts.tweets.shape[1]
+    window_retweets = {size: sp.csr_matrix((N, N), dtype=np.int64) for size in sizes}
+    window_tweets = {size: sp.csr_matrix((1, N), dtype=np.int64) for size in sizes}
+
+    for d in range(len(counts.dates)):
+        for size in sizes:
+            window_retweets[size] = window_retweets[size] + counts.retweets[d]
+            window_tweets[size] = window_tweets[size] + counts.tweets[d]
+
+            # Expired day
+            if d >= size:
+                window_retweets[size] = window_retweets[size] - counts.retweets[d - size]
+                window_retweets[size].eliminate_zeros()
+                window_tweets[size] = window_tweets[size] - counts.tweets[d - size]
+                window_tweets[size].eliminate_zeros()
+
+            if d >= size - 1:
+                yield size, counts.dates[d - size + 1], window_retweets[size], window_tweets[size].toarray().ravel()
+
+#=========================================================================================================================
+def get_source_target(window: sp.csr_matrix, master_id: pd.DataFrame) -> pd.DataFrame:
+    """
+    Creates the Source-Target DataFrame of a window. The normal weight is the number of retweets from source to
+    target over the total retweets of the source in the window.
+
+    Args:
+        window (csr_matrix): Retweets of the window, see rolling_windows.
+        master_id (DataFrame): Master Index with columns 'User ID', 'Political Affiliation' and 'Label'. Row i is vertex i.
+
+    Returns:
+        DataFrame: One row per (Source, Target) pair, sorted by Source and Target, with the same columns as the
+        Source_Target files.
+    """
+    window = window.tocsr()
+    window.sort_indices()
+    total = np.asarray(window.sum(axis=1)).ravel()
+    source = np.repeat(np.arange(window.shape[0]), np.diff(window.indptr))
+    target = window.indices
+    number_of_rts = window.data
+
+    user_id = master_id['User ID'].to_numpy(dtype=np.int64)
+    political_affiliation = master_id['Political Affiliation'].to_numpy()
+    label = master_id['Label'].to_numpy()
+
+    return pd.DataFrame({
+        'Source': source.astype(int),
+        'Target': target.astype(int),
+        'source_user_id': user_id[source],
+        'target_user_id': user_id[target],
+        'number_of_rts': number_of_rts.astype(int),
+        'normal_weight': number_of_rts / total[source],
+        'source_political_afilliation': political_affiliation[source],
+        'target_political_afilliation': political_affiliation[target],
+        'source_label': label[source],
+        'target_label': label[target]
+    })
+
+#=========================================================================================================================
+def get_tweets_per_day(tweets: np.ndarray, master_id: pd.DataFrame) -> dict:
+    """
+    Creates the Tweets_Per_Day dictionary of a window.
+
+    Args:
+        tweets (ndarray): Original tweets of every vertex in the window, see rolling_windows.
+        master_id (DataFrame): Master Index with column 'User ID'. Row i is vertex i.
+
+    Returns:
+        dict: Keys are User IDs and values the number of original tweets in the window.
+    """
+    return dict(zip(master_id['User ID'].astype(np.int64).tolist(), tweets.astype(float).tolist()))
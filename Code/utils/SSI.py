@@ -1,54 +1,141 @@
 import graph_tool.all as gt
-from Code.utils.Bojanowski import *
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import eigsh
+import concurrent.futures
+from utils.Bojanowski import *
+
+# Components up to this size are solved with dense eigh, stacked by size
+SMALL_COMPONENT = 64
 
 #=========================================================================================================================
-def SSI(g:gt.Graph, type:str):
-    # Get undirected graph
-    g_undir = g.copy()
-    g_undir.set_directed(False)
+def get_ssi_matrix(g:gt.Graph, type:str) -> sp.csr_matrix:
+    """
+    Gets the symmetric matrix of the Spectral Segregation Index. The adjacency of the undirected graph is normalized
+    by rows, restricted to the nodes of the group (B) and symmetrized (B + B^T), that is the weighted adjacency of the
+    undirected graph made with the edges of B. Nodes without neighbours get a row of zeros.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        type (String): The name of the bool PropertyMap of the group.
 
-    # Normalize adjacency
-    adj = get_adjacency(g_undir)
-    adj_norm = adj / adj.sum(axis=1, keepdims=True)
+    Returns:
+        csr_matrix: Sparse matrix of shape (n,n), n is the number of nodes of the group, in the order of the vertices.
+    """
+    # Normalize adjacency of the zero-copy undirected view
+    adj = get_sparse_adjacency(gt.GraphView(g, directed=False))
+    degree = np.asarray(adj.sum(axis=1)).ravel()
+    with np.errstate(divide='ignore'):
+        inverse = np.where(degree > 0, 1 / degree, 0)
+    adj_norm = sp.diags(inverse) @ adj
 
     # Get B matrix
-    tipos = g.vp[type].a
-    B = adj_norm[tipos.astype(bool)][:, tipos.astype(bool)]
-    B.shape
-
-    # Add edges to the graph based on the weighted adjacency matrix
-    idx = B.nonzero()
-    weights = B[idx]
-    sub = gt.Graph(directed = False)
-    sub.add_edge_list(np.transpose(idx))
-    ew = sub.new_edge_property("double")
-    ew.a = weights 
-    sub.ep['weights'] = ew
-
-    # Get connected components
-    components, hist = gt.label_components(sub)
-    del hist
-    eigvals_CC = {}
-    eigvect_CC = {}
-
-    for label in np.unique(components.a):
-        # Prepare filter map
-        filtered_nodes = sub.new_vertex_property("bool")
-        filtered_nodes.a = False
-        
-        for v in sub.vertices():
-            if components[v] == label:
-                filtered_nodes[v] = True
-        
-        # create a new subgraph object for each of the components
-        subgraph = gt.GraphView(sub, vfilt=filtered_nodes)
-        B_CC = get_adjacency(subgraph, 'weights')
-        
-        # Get igen values and vector. Store the biigest eigenvalue with its vector
-        eigenvalues, eigenvectors = np.linalg.eig(B_CC)
-        node_level_seg = eigenvectors[np.argmax(eigenvalues)]
-        SSI_CC = np.max(eigenvalues)
-        eigvals_CC[f"Component {label}"] = SSI_CC
-        eigvect_CC[f"Component {label}"] = node_level_seg
-    
-    return eigvals_CC, eigvect_CC
\ No newline at end of file
+    tipos = g.vp[type].a.astype(bool)
+    B = adj_norm[tipos][:, tipos]
+    return sp.csr_matrix(B + B.T)
+
+#=========================================================================================================================
+def leading_eigenpair(S) -> tuple:
+    """
+    Biggest eigenvalue and its eigenvector of a symmetric matrix. Dense matrices are solved with np.linalg.eigh and
+    sparse matrices with ARPACK (Lanczos), that only computes the leading eigenpair. The sign of the eigenvector is
+    chosen so it sums to a positive number.
+
+    Args:
+        S (ndarray or csr_matrix): Symmetric matrix of shape (n,n).
+
+    Returns:
+        tuple: The biggest eigenvalue (float) and its eigenvector (ndarray of shape (n,))
+    """
+    if sp.issparse(S):
+        eigenvalues, eigenvectors = eigsh(S, k=1, which='LA')
+    else:
+        eigenvalues, eigenvectors = np.linalg.eigh(S)
+    vector = eigenvectors[:, -1]
+    if vector.sum() < 0:
+        vector = -vector
+    return eigenvalues[-1], vector
+
+#=========================================================================================================================
+def SSI(g:gt.Graph, type:str, max_workers = None):
+    """
+    Spectral Segregation Index of a group. For every connected component of the undirected graph of the group, the
+    index is the biggest eigenvalue of its normalized adjacency and the node level segregation is the eigenvector.
+
+    Components of size 1 and 2 are solved in closed form, components up to SMALL_COMPONENT nodes are solved together
+    with a batched np.linalg.eigh for each size and bigger components with a sparse iterative solver.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        type (String): The name of the bool PropertyMap of the group.
+        max_workers (int): If given, the big components are solved in a ProcessPoolExecutor with this many workers.
+
+    Returns:
+        tuple: Two dicts with keys "Component {label}". The first one has the index of each component and the second
+        one the node level segregation, in the order of the vertices of the group that belong to the component.
+    """
+    S = get_ssi_matrix(g, type)
+
+    # Get connected components, and sort the nodes by component
+    n_components, labels = connected_components(S, directed=False)
+    order = np.argsort(labels, kind='stable')
+    sizes = np.bincount(labels, minlength=n_components)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    # Block diagonal matrix, one block per component
+    P = S[order][:, order].tocoo()
+    entry_component = labels[order][P.row]
+
+    eigvals_CC = np.zeros(n_components)
+    eigvect_CC = [None] * n_components
+
+    # Components of size 1: the only entry is the self loop
+    single = np.flatnonzero(sizes == 1)
+    diagonal = S.diagonal()[order]
+    eigvals_CC[single] = diagonal[starts[single]]
+    for label in single:
+        eigvect_CC[label] = np.ones(1)
+
+    # Components up to SMALL_COMPONENT nodes: dense blocks stacked by size
+    for size in np.unique(sizes[(sizes >= 2) & (sizes <= SMALL_COMPONENT)]):
+        components = np.flatnonzero(sizes == size)
+        rank = np.full(n_components, -1)
+        rank[components] = np.arange(len(components))
+        entries = rank[entry_component] >= 0
+        blocks = np.zeros((len(components), size, size))
+        component = entry_component[entries]
+        blocks[rank[component], P.row[entries] - starts[component], P.col[entries] - starts[component]] = P.data[entries]
+
+        if size == 2:
+            # Closed form for 2x2 symmetric matrices [[a, b], [b, d]]
+            a, b, d = blocks[:, 0, 0], blocks[:, 0, 1], blocks[:, 1, 1]
+            values = (a + d) / 2 + np.sqrt(((a - d) / 2) ** 2 + b ** 2)
+            vectors = np.stack([b, values - a], axis=1)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        else:
+            eigenvalues, eigenvectors = np.linalg.eigh(blocks)
+            values = eigenvalues[:, -1]
+            vectors = eigenvectors[:, :, -1]
+            vectors *= np.where(vectors.sum(axis=1, keepdims=True) < 0, -1, 1)
+
+        eigvals_CC[components] = values
+        for label, vector in zip(components, vectors):
+            eigvect_CC[label] = vector
+
+    # Big components: leading eigenpair of each sparse block
+    big = np.flatnonzero(sizes > SMALL_COMPONENT)
+    P = P.tocsr()
+    blocks = [P[starts[label]:starts[label] + sizes[label], starts[label]:starts[label] + sizes[label]] for label in big]
+    if max_workers and len(big) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(leading_eigenpair, blocks))
+    else:
+        results = [leading_eigenpair(block) for block in blocks]
+    for label, (value, vector) in zip(big, results):
+        eigvals_CC[label] = value
+        eigvect_CC[label] = vector
+
+    eigvals_CC = {f"Component {label}": eigvals_CC[label] for label in range(n_components)}
+    eigvect_CC = {f"Component {label}": eigvect_CC[label] for label in range(n_components)}
+    return eigvals_CC, eigvect_CC
@@ -0,0 +1,150 @@
+import os
+import numpy as np
+import pandas as pd
+import graph_tool.all as gt
+from utils.GraphCache import load_graph
+from utils.Bojanowski import *
+from utils.Freeman import freeman_classic_from_layer, freeman_groups_from_layer, freeman_global_from_layer
+import utils.Proximity as Pr
+import utils.Homophily as Ho
+
+# Indexes that evaluate_graph knows how to calculate
+INDICES = ('Classic Freeman', 'Freeman Global', 'Freeman One vs Others', 'Homophily', 'Proximity', 'Individual Proximity',
+           'Assortativity')
+
+# Indexes that are calculated over the undirected version of the graph
+FREEMAN_INDICES = ('Classic Freeman', 'Freeman Global', 'Freeman One vs Others')
+
+# Suffix of the name of the index for each EdgePropertyMap used as weights of the Proximity Index
+PROXIMITY_WEIGHTS = {'': 'Normal Weight', ' (Sin NPD)': 'Normal W Sin NPD'}
+
+# Name of the Assortativity index for each EdgePropertyMap used as weights (None for the non weighted one)
+ASSORTATIVITY_WEIGHTS = {
+    'Non Weighted Assortativity': None,
+    'Normal Weighted Assortativity': 'Normal Weight',
+    'Weighted Assortativity': 'Number of rts'
+}
+
+# Columns of the tidy DataFrame returned by evaluate_graph
+COLUMNS = ['Date', 'Level', 'Index', 'Group', 'Node', 'Value']
+
+#=========================================================================================================================
+def get_graph_date(file: str) -> str:
+    """
+    Gets the date of a graph from the name of its file, e.g. 'starting_2021-05-04.graphml' -> '2021-05-04'
+
+    Args:
+        file (String): Path of the graph file.
+
+    Returns:
+        str: Date of the graph
+    """
+    return os.path.basename(file).split('.')[0].split('_')[-1]
+
+#=========================================================================================================================
+def evaluate_graph(file: str, indices = INDICES, categories = None) -> pd.DataFrame:
+    """
+    Calculates several segregation indexes of a graph in a single pass. The graph is loaded once and the
+    intermediates shared by the indexes (types encodings, undirected view, its adjacency and the contact layers)
+    are calculated once, instead of loading the graph again for every index and every group. The graph is loaded
+    from its binary cache when it is up to date.
+
+    Args:
+        file (String): Path of the graph file.
+        indices (list): Names of the indexes to calculate, any of INDICES.
+        categories (list): Names of the bool PropertyMaps used by the Classic Freeman and the group Assortativity
+            Indexes. By default, the groups of 'Political Label' in the graph.
+
+    Returns:
+        DataFrame: Tidy DataFrame with columns Date, Level, Index, Group, Node and Value. Level is 'Global', 'Group'
+            or 'Individual'. Group is the group of the index (None for global indexes) and Node the vertex of the
+            individual indexes (None otherwise). Isolated nodes are not included in the individual indexes.
+    """
+    unknown = [index for index in indices if index not in INDICES]
+    if unknown:
+        raise ValueError(f"Unknown indexes {unknown}. Available indexes are {list(INDICES)}")
+
+    g = load_graph(file)
+    date = get_graph_date(file)
+    labels = get_types_encoding(g, 'Political Label')
+    groups = [str(group) for group in labels.groups]
+    if categories is None:
+        categories = groups
+
+    records = []
+    frames = []
+
+    # Freeman Indexes are for undirected and unweighted graphs. They share the adjacency of the undirected view
+    if any(index in FREEMAN_INDICES for index in indices):
+        u = gt.GraphView(g, directed=False)
+        adj = get_sparse_adjacency(u)
+        edges, nodes = u.num_edges(), u.num_vertices()
+        M = sparse_contact_layer(adj, labels.matrix, directed=False)
+
+    if 'Classic Freeman' in indices:
+        for pol in categories:
+            encoding = get_types_encoding(g, pol)
+            M_pol = sparse_contact_layer(adj, encoding.matrix, directed=False)
+            seg = freeman_classic_from_layer(M_pol, encoding.sizes, edges, nodes)
+            records.append((date, 'Group', 'Classic Freeman', pol, None, seg))
+
+    if 'Freeman Global' in indices:
+        seg = freeman_global_from_layer(M, labels.sizes)
+        records.append((date, 'Global', 'Freeman Global', None, None, seg))
+
+    if 'Freeman One vs Others' in indices:
+        for group, i in labels.index.items():
+            # 'Political Label' is not bool, so the columns of the contact layer follow the codes
+            seg = freeman_groups_from_layer(M, i, labels.sizes[i], nodes)
+            records.append((date, 'Group', 'Freeman One vs Others', group, None, seg))
+
+    if 'Homophily' in indices:
+        homophily = Ho.homophily_index(graph = g, property_name = 'Political Label')
+        for group in labels.groups:
+            records.append((date, 'Group', 'Homiphily Index', str(group), None, homophily['H_i'][group]))
+            records.append((date, 'Group', 'Inbreeding Homiphily Index', str(group), None, homophily['IH_i'][group]))
+
+    if 'Proximity' in indices or 'Individual Proximity' in indices:
+        den = Pr.at_random_scenarios(g, 'Political Label')
+
+    if 'Proximity' in indices:
+        for suffix, weights in PROXIMITY_WEIGHTS.items():
+            P = Pr.proximity_matrices(g, 'Political Label', weights)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                others_in = P['In Others'] / den['Proximity to Others']
+                others_out = P['Out Others'] / den['Proximity to Others']
+                group_in = P['In'] / den['Proximity to Group']
+                group_out = P['Out'] / den['Proximity to Group']
+            for group_g, i in labels.index.items():
+                records.append((date, 'Group', 'Proximity to Others' + suffix, group_g, None, others_in[i]))
+                records.append((date, 'Group', "Other's Proximity" + suffix, group_g, None, others_out[i]))
+                for group_h, j in labels.index.items():
+                    records.append((date, 'Group', f'Proximity From {group_g} To' + suffix, group_h, None, group_in[i, j]))
+                    records.append((date, 'Group', f'Proximity {group_g} Took From' + suffix, group_h, None, group_out[i, j]))
+
+    if 'Individual Proximity' in indices:
+        W_jk, W_j_others = Pr.individual_proximity_matrix(g, 'Normal Weight', 'Political Label')
+        active = np.flatnonzero(~np.isnan(W_j_others))
+        own_group = labels.codes[active]
+        K = len(groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            to_group = (W_jk[active] / den['Proximity to Group']).ravel()
+            to_others = W_j_others[active] / den['Proximity to Others'][own_group]
+        frames.append(pd.DataFrame({'Date': date, 'Level': 'Individual', 'Index': 'Proximity index',
+                                    'Group': np.tile(groups, len(active)), 'Node': np.repeat(active, K),
+                                    'Value': to_group}))
+        frames.append(pd.DataFrame({'Date': date, 'Level': 'Individual', 'Index': 'Proximity to Others',
+                                    'Group': np.asarray(groups, dtype=object)[own_group], 'Node': active,
+                                    'Value': to_others}))
+
+    if 'Assortativity' in indices:
+        for name, weights in ASSORTATIVITY_WEIGHTS.items():
+            eweight = None if weights is None else g.ep[weights]
+            for pol in categories:
+                seg = gt.assortativity(g, g.vp[pol], eweight=eweight)[0]
+                records.append((date, 'Group', name, pol, None, seg))
+            seg = gt.assortativity(g, g.vp['Political Label'], eweight=eweight)[0]
+            records.append((date, 'Global', name, None, None, seg))
+
+    frames.insert(0, pd.DataFrame.from_records(records, columns=COLUMNS))
+    return pd.concat(frames, ignore_index=True)[COLUMNS]
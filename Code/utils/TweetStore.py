@@ -0,0 +1,363 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Columns with IDs of tweets and users. Stored as int64, float64 loses precision over 2^53
+ID_COLUMNS = ['ID', 'Author ID', 'Referenced Tweet Author ID', 'Referenced Tweet']
+
+# Columns with few different values, stored as categorical
+CATEGORY_COLUMNS = ['Reference Type', 'Author Verified']
+
+# The store is partitioned by day and by reference type: Day=2021-05-04/Reference Type=retweeted/
+PARTITIONING = ds.partitioning(pa.schema([('Day', pa.string()), ('Reference Type', pa.string())]), flavor='hive')
+
+# Name of the retweeted user in the text of a retweet: between the first '@' and the next '@', before the first ': '
+REFERENCE_AUTHOR_PATTERN = r'^(?:(?!: )[^@])*@((?:(?!: )[^@])*)'
+
+# Columns of the retweets and of the original tweets used for the graphs, and their names in the store
+RETWEET_COLUMNS = ['Tweet ID', 'Author ID', 'Author Name', 'Referenced Tweet Author ID', 'Referenced Tweet Author Name',
+                   'Referenced Tweet ID', 'Date']
+ORIGINAL_COLUMNS = ['Tweet ID', 'Author ID', 'Author Name', 'Date']
+STORE_NAMES = {'Tweet ID': 'ID', 'Referenced Tweet ID': 'Referenced Tweet'}
+
+# Raw files are ingested in batches of about this many bytes of csv. Each batch writes one file per partition, so the
+# partitions get a few large files instead of one small file per raw file
+BATCH_BYTES = 2**29
+
+# Ingestion manifest, in the root of the store. Files starting with '_' are not read as part of the dataset
+MANIFEST = '_manifest.csv'
+MANIFEST_COLUMNS = ['File', 'Size', 'Modified', 'Status', 'Rows', 'Outputs']
+
+#=========================================================================================================================
+def to_int64_ids(x: pd.Series) -> pd.Series:
+    """
+    Converts a column of IDs read as text into nullable int64. Values like '123' or '123.0' are kept, anything else
+    is missing.
+
+    Args:
+        x (Series): Column of IDs.
+
+    Returns:
+        Series: Column of dtype Int64
+    """
+    digits = x.astype('string').str.extract(r'^\s*(\d+)(?:\.0*)?\s*$', expand=False)
+    valid = digits.notna().to_numpy()
+    values = np.zeros(len(x), dtype=np.int64)
+    values[valid] = digits[valid].astype(np.int64).to_numpy()
+    return pd.Series(pd.arrays.IntegerArray(values, ~valid), index=x.index)
+
+#=========================================================================================================================
+def prepare_tweets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gives the tweets read from the raw files the dtypes of the store: int64 IDs, categorical columns and a 'Day'
+    column for the partitions. Tweets that don't reference anyone are marked as 'original tweet'.
+
+    Args:
+        df (DataFrame): Tweets read from a raw csv file. IDs should be read as text.
+
+    Returns:
+        DataFrame: Tweets with the dtypes of the store
+    """
+    df = df.copy()
+    for column in ID_COLUMNS:
+        if column in df:
+            df[column] = to_int64_ids(df[column])
+
+    # Fill tweets that doesn't reference anyone as original
+    df['Reference Type'] = df['Reference Type'].fillna('original tweet')
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Day'] = df['Date'].dt.strftime('%Y-%m-%d')
+
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype(str).astype('category')
+    return df
+
+#=========================================================================================================================
+def get_reference_author_names(text: pd.Series) -> pd.Series:
+    """
+    Extracts the name of the retweeted user from the text of the retweets, e.g. 'RT @user: ...' -> 'user'.
+
+    Args:
+        text (Series): Text of the retweets.
+
+    Returns:
+        Series: Categorical column with the names. Texts without a name before ': ' get NaN
+    """
+    names = text.astype(object).str.extract(REFERENCE_AUTHOR_PATTERN, expand=False)
+    return names.astype('category')
+
+#=========================================================================================================================
+def write_tweets(df: pd.DataFrame, root: str, name: str) -> list:
+    """
+    Writes the tweets into the partitioned Parquet store. Each call writes its own files, named after name, so
+    several processes can write in the same store at the same time and new data is appended to what is already there.
+    Every call writes one file per partition, so the tweets of several raw files should be written together, see
+    get_batches.
+
+    Args:
+        df (DataFrame): Tweets, see prepare_tweets.
+        root (String): Directory of the store.
+        name (String): Unique name for the files of this call, e.g. the name of the first raw file of the batch.
+
+    Returns:
+        list: Paths of the written files
+    """
+    written = []
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(table, root, format='parquet', partitioning=PARTITIONING,
+                     basename_template=f'{name}-{{i}}.parquet', existing_data_behavior='overwrite_or_ignore',
+                     file_visitor=lambda file: written.append(file.path))
+    return written
+
+#=========================================================================================================================
+def read_tweets(root: str, columns = None, days = None, reference_types = None, filter = None) -> pd.DataFrame:
+    """
+    Reads tweets from the partitioned Parquet store. Only the requested columns are read and the partitions of other
+    days or reference types are skipped without being opened.
+
+    Args:
+        root (String): Directory of the store.
+        columns (list): Columns to read. By default, all of them.
+        days (list): Days to read, as dates or 'YYYY-MM-DD' strings. By default, all of them.
+        reference_types (list): Reference types to read, e.g. ['retweeted']. By default, all of them.
+        filter (Expression): Additional pyarrow filter, pushed down to the Parquet files.
+
+    Returns:
+        DataFrame: The tweets
+    """
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+
+    expression = filter
+    if days is not None:
+        days = [pd.Timestamp(day).strftime('%Y-%m-%d') for day in days]
+        expression = ds.field('Day').isin(days) if expression is None else expression & ds.field('Day').isin(days)
+    if reference_types is not None:
+        types = ds.field('Reference Type').isin(list(reference_types))
+        expression = types if expression is None else expression & types
+
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df
+
+#=========================================================================================================================
+def read_retweets(root: str, columns = None, days = None, filter = None) -> pd.DataFrame:
+    """
+    Reads the retweets from the store with the columns used for the graphs (see RETWEET_COLUMNS). Only the
+    partitions of retweets and the store columns behind the requested ones are read. The name of the retweeted user
+    is extracted from the text, so 'Text' is only read when 'Referenced Tweet Author Name' is requested. Retweets
+    without author are left out.
+
+    Args:
+        root (String): Directory of the store.
+        columns (list): Columns to return, from RETWEET_COLUMNS. By default, all of them.
+        days (list): Days to read, see read_tweets. By default, all of them.
+        filter (Expression): Additional pyarrow filter on the columns of the store, see read_tweets.
+
+    Returns:
+        DataFrame: The retweets
+    """
+    columns = RETWEET_COLUMNS if columns is None else list(columns)
+    names = 'Referenced Tweet Author Name' in columns
+    read = [STORE_NAMES.get(column, column) for column in columns if column != 'Referenced Tweet Author Name']
+    if names:
+        read.append('Text')
+    if 'Author ID' not in read:
+        read.append('Author ID')
+
+    retweets = read_tweets(root, columns=read, days=days, reference_types=['retweeted'], filter=filter)
+    retweets = retweets.dropna(subset='Author ID').reset_index(drop=True)
+    if names:
+        retweets['Referenced Tweet Author Name'] = get_reference_author_names(retweets['Text'])
+    return retweets.rename(columns={store: column for column, store in STORE_NAMES.items()})[columns]
+
+#=========================================================================================================================
+def read_original_tweets(root: str, columns = None, days = None, filter = None) -> pd.DataFrame:
+    """
+    Reads the original tweets from the store with the columns used for the graphs (see ORIGINAL_COLUMNS). Only the
+    partitions of original tweets and the requested columns are read. Tweets without author are left out.
+
+    Args:
+        root (String): Directory of the store.
+        columns (list): Columns to return, from ORIGINAL_COLUMNS. By default, all of them.
+        days (list): Days to read, see read_tweets. By default, all of them.
+        filter (Expression): Additional pyarrow filter on the columns of the store, see read_tweets.
+
+    Returns:
+        DataFrame: The original tweets
+    """
+    columns = ORIGINAL_COLUMNS if columns is None else list(columns)
+    read = [STORE_NAMES.get(column, column) for column in columns]
+    if 'Author ID' not in read:
+        read.append('Author ID')
+
+    tweets = read_tweets(root, columns=read, days=days, reference_types=['original tweet'], filter=filter)
+    tweets = tweets.dropna(subset='Author ID').reset_index(drop=True)
+    return tweets.rename(columns={store: column for column, store in STORE_NAMES.items()})[columns]
+
+#=========================================================================================================================
+def get_first_retweets(retweets: pd.DataFrame) -> pd.DataFrame:
+    """
+    The first retweet of every retweeted tweet, as a stand-in for the original tweet when it is not in the store.
+    The retweeted user becomes the author and the date is the one of the first retweet.
+
+    Args:
+        retweets (DataFrame): Retweets with columns 'Referenced Tweet ID', 'Referenced Tweet Author ID' and 'Date',
+            and optionally 'Referenced Tweet Author Name'. See read_retweets.
+
+    Returns:
+        DataFrame: One row per retweeted tweet with columns 'Author ID', 'Tweet ID', 'Date' and 'Author Name' if
+        the name was given
+    """
+    cols = [column for column in ['Referenced Tweet Author ID', 'Referenced Tweet Author Name', 'Referenced Tweet ID',
+                                  'Date'] if column in retweets]
+    first = retweets[cols].sort_values(by=['Referenced Tweet ID', 'Date'], kind='stable')
+    first = first.drop_duplicates(subset='Referenced Tweet ID')
+    return first.rename(columns={
+        'Referenced Tweet ID': 'Tweet ID',
+        'Referenced Tweet Author ID': 'Author ID',
+        'Referenced Tweet Author Name': 'Author Name',
+    })
+
+#=========================================================================================================================
+def file_signature(file: str) -> tuple:
+    """
+    Size and modification time of a raw file. A file is processed again when any of them changes.
+
+    Args:
+        file (String): Path of the raw file.
+
+    Returns:
+        tuple: (size in bytes, modification time in nanoseconds)
+    """
+    stat = os.stat(file)
+    return stat.st_size, stat.st_mtime_ns
+
+#=========================================================================================================================
+def get_batches(files: list, batch_bytes = BATCH_BYTES, min_batches = None) -> list:
+    """
+    Groups raw files in batches of consecutive files with about batch_bytes of csv. Every batch is written to the
+    store at once, see write_tweets. Batches are made smaller when there are fewer than min_batches, so that every
+    worker gets one.
+
+    Args:
+        files (list): Paths of the raw files.
+        batch_bytes (int): Maximum size of a batch in bytes. A single bigger file is a batch on its own.
+        min_batches (int): Minimum number of batches, if there are enough files. By default, the number of CPUs.
+
+    Returns:
+        list: Lists of paths, one per batch
+    """
+    sizes = [os.path.getsize(file) for file in files]
+    if min_batches is None:
+        min_batches = os.cpu_count() or 1
+    batch_bytes = max(1, min(batch_bytes, sum(sizes) // min_batches))
+
+    batches, batch, batch_size = [], [], 0
+    for file, size in zip(files, sizes):
+        if batch and batch_size + size > batch_bytes:
+            batches.append(batch)
+            batch, batch_size = [], 0
+        batch.append(file)
+        batch_size += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+#=========================================================================================================================
+def read_manifest(root: str) -> pd.DataFrame:
+    """
+    Reads the ingestion manifest of the store. The manifest is only appended to, so the last entry of each file is
+    the one that counts.
+
+    Args:
+        root (String): Directory of the store.
+
+    Returns:
+        DataFrame: One row per raw file with columns File, Size, Modified, Status, Rows and Outputs. Outputs is the
+        list of the files written for the raw file.
+    """
+    file = os.path.join(root, MANIFEST)
+    if not os.path.exists(file):
+        return pd.DataFrame(columns=MANIFEST_COLUMNS)
+
+    manifest = pd.read_csv(file, dtype={'File': str, 'Outputs': str}, keep_default_na=False)
+    manifest = manifest.drop_duplicates(subset='File', keep='last').reset_index(drop=True)
+    manifest['Outputs'] = [outputs.split('|') if outputs else [] for outputs in manifest['Outputs']]
+    return manifest
+
+#=========================================================================================================================
+def append_manifest(root: str, stats: dict):
+    """
+    Records the result of a raw file in the ingestion manifest. Each result is written as soon as it is known, so
+    a run that stops midway keeps the files that were already done.
+
+    Args:
+        root (String): Directory of the store.
+        stats (dict): Result of the raw file with the keys of MANIFEST_COLUMNS. Outputs is a list of paths.
+    """
+    os.makedirs(root, exist_ok=True)
+    file = os.path.join(root, MANIFEST)
+    row = dict(stats, Outputs='|'.join(stats['Outputs']))
+    pd.DataFrame([row], columns=MANIFEST_COLUMNS).to_csv(file, mode='a', header=not os.path.exists(file), index=False)
+
+#=========================================================================================================================
+def pending_files(files: list, manifest: pd.DataFrame) -> list:
+    """
+    Raw files that are not in the manifest, that didn't end as 'ok' (e.g. a transient read error) or whose size or
+    modification time changed since they were processed. Files that were written in the same batch as one of them
+    share its outputs, so they are processed again too.
+
+    Args:
+        files (list): Paths of the raw files.
+        manifest (DataFrame): Ingestion manifest, see read_manifest.
+
+    Returns:
+        list: Paths of the raw files that have to be processed
+    """
+    ok = manifest[manifest['Status'] == 'ok']
+    known = dict(zip(ok['File'], zip(ok['Size'].astype('int64'), ok['Modified'].astype('int64'))))
+    pending = {file for file in files if known.get(file) != file_signature(file)}
+
+    # Outputs of the pending files are removed, the files that share them have to be written again
+    outputs = {output for file_outputs in manifest.loc[manifest['File'].isin(pending), 'Outputs'] for output in file_outputs}
+    shared = manifest.loc[[not outputs.isdisjoint(file_outputs) for file_outputs in manifest['Outputs']], 'File']
+    pending.update(shared)
+    return [file for file in files if file in pending]
+
+#=========================================================================================================================
+def remove_outputs(manifest: pd.DataFrame, files: list):
+    """
+    Deletes the files written for some raw files in a previous run, so a raw file that changed does not leave
+    stale tweets in partitions that it no longer has.
+
+    Args:
+        manifest (DataFrame): Ingestion manifest, see read_manifest.
+        files (list): Paths of the raw files.
+    """
+    for outputs in manifest.loc[manifest['File'].isin(files), 'Outputs']:
+        for output in outputs:
+            if os.path.exists(output):
+                os.remove(output)
+
+#=========================================================================================================================
+def remove_written(root: str, name: str):
+    """
+    Deletes every file written under root with a name, the ones of write_tweets ({name}-{i}.parquet in every
+    partition) and of write_user_aggregates ({name}.parquet). It is used when a batch fails midway, since the files
+    written before the error are not in the manifest and remove_outputs can't find them.
+
+    Args:
+        root (String): Directory of the store.
+        name (String): Name given to write_tweets or write_user_aggregates.
+    """
+    pattern = re.compile(re.escape(name) + r'(?:-\d+)?\.parquet')
+    for folder, _, files in os.walk(root):
+        for file in files:
+            if pattern.fullmatch(file):
+                os.remove(os.path.join(folder, file))
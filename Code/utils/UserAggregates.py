@@ -0,0 +1,142 @@
+import os
+import pandas as pd
+from typing import NamedTuple
+
+# Users are identified by their ID and name
+KEYS = ['Author ID', 'Author Name']
+
+# Columns averaged over the tweets of each user
+MEAN_COLUMNS = ['Author Followers', 'Author Following']
+
+# Columns with the maximum over the tweets of each user
+MAX_COLUMNS = ['Author Tweets']
+
+# Columns with the distinct values of each user, joined as text
+DISTINCT_COLUMNS = ['Author Location', 'Author Description', 'Author Verified']
+
+# Columns of the users information, in order
+COLUMNS = ['Author Location', 'Author Description', 'Author Followers', 'Author Following', 'Author Tweets', 'Author Verified']
+
+class UserAggregates(NamedTuple):
+    """
+    Partial aggregates of the users information. Partials of different files are merged exactly with
+    merge_user_aggregates, the means and the distinct values are only computed at the end with get_users_information.
+
+    Attributes:
+        numeric (DataFrame): One row per user. Sum and count of every mean column ('Author Followers Sum',
+            'Author Followers Count', ...) and maximum of every max column.
+        distinct (DataFrame): One row per distinct (user, column, value) with columns KEYS, 'Column' and 'Value'.
+    """
+    numeric: pd.DataFrame
+    distinct: pd.DataFrame
+
+#=========================================================================================================================
+def get_user_aggregates(df: pd.DataFrame) -> UserAggregates:
+    """
+    Partial aggregates of the users information of some tweets, with built-in groupby reductions.
+
+    Args:
+        df (DataFrame): Tweets with the columns KEYS, MEAN_COLUMNS, MAX_COLUMNS and DISTINCT_COLUMNS.
+
+    Returns:
+        UserAggregates: The partial aggregates
+    """
+    df = df.dropna(subset=KEYS)
+    numeric = df[KEYS].copy()
+    for column in MEAN_COLUMNS + MAX_COLUMNS:
+        numeric[column] = pd.to_numeric(df[column], errors='coerce')
+
+    grouped = numeric.groupby(KEYS)
+    sums = grouped[MEAN_COLUMNS].sum().add_suffix(' Sum')
+    counts = grouped[MEAN_COLUMNS].count().add_suffix(' Count')
+    maxima = grouped[MAX_COLUMNS].max()
+    numeric = pd.concat([sums, counts, maxima], axis=1).reset_index()
+
+    # Missing values are kept as 'nan', like the rest of values they are written as text
+    distinct = df[KEYS + DISTINCT_COLUMNS].melt(id_vars=KEYS, var_name='Column', value_name='Value')
+    distinct['Value'] = distinct['Value'].astype(object).fillna('nan').astype(str)
+    distinct = distinct.drop_duplicates(ignore_index=True)
+
+    return UserAggregates(numeric, distinct)
+
+#=========================================================================================================================
+def merge_user_aggregates(aggregates: list) -> UserAggregates:
+    """
+    Merges the partial aggregates of several files. Sums and counts are added, maxima are combined with max and the
+    distinct values are united, so the result is the same as aggregating all the tweets at once.
+
+    Args:
+        aggregates (list): UserAggregates to merge.
+
+    Returns:
+        UserAggregates: The merged partial aggregates
+    """
+    numeric = pd.concat([aggregate.numeric for aggregate in aggregates], ignore_index=True)
+    grouped = numeric.groupby(KEYS)
+    sum_columns = [f'{column} Sum' for column in MEAN_COLUMNS] + [f'{column} Count' for column in MEAN_COLUMNS]
+    numeric = pd.concat([grouped[sum_columns].sum(), grouped[MAX_COLUMNS].max()], axis=1).reset_index()
+
+    distinct = pd.concat([aggregate.distinct for aggregate in aggregates], ignore_index=True)
+    distinct = distinct.drop_duplicates(ignore_index=True)
+
+    return UserAggregates(numeric, distinct)
+
+#=========================================================================================================================
+def write_user_aggregates(aggregates: UserAggregates, root: str, name: str) -> list:
+    """
+    Writes partial aggregates in root/Numeric/{name}.parquet and root/Distinct/{name}.parquet
+
+    Args:
+        aggregates (UserAggregates): Partial aggregates.
+        root (String): Directory of the users store.
+        name (String): Unique name of the files, e.g. the name of the raw file.
+
+    Returns:
+        list: Paths of the written files
+    """
+    written = []
+    for folder, frame in (('Numeric', aggregates.numeric), ('Distinct', aggregates.distinct)):
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        file = os.path.join(root, folder, f'{name}.parquet')
+        frame.to_parquet(file, index=False)
+        written.append(file)
+    return written
+
+#=========================================================================================================================
+def read_user_aggregates(root: str) -> UserAggregates:
+    """
+    Reads and merges all the partial aggregates written in the users store.
+
+    Args:
+        root (String): Directory of the users store.
+
+    Returns:
+        UserAggregates: The merged partial aggregates
+    """
+    numeric = pd.read_parquet(os.path.join(root, 'Numeric'))
+    distinct = pd.read_parquet(os.path.join(root, 'Distinct'))
+    return merge_user_aggregates([UserAggregates(numeric, distinct)])
+
+#=========================================================================================================================
+def get_users_information(aggregates: UserAggregates) -> pd.DataFrame:
+    """
+    Final users information: mean of MEAN_COLUMNS, maximum of MAX_COLUMNS and the distinct values of
+    DISTINCT_COLUMNS joined with ', '.
+
+    Args:
+        aggregates (UserAggregates): Merged partial aggregates.
+
+    Returns:
+        DataFrame: Users information indexed by KEYS, with columns COLUMNS
+    """
+    numeric = aggregates.numeric.set_index(KEYS)
+    users = pd.DataFrame(index=numeric.index)
+    for column in MEAN_COLUMNS:
+        # Users without values get NaN (0/0)
+        users[column] = numeric[f'{column} Sum'] / numeric[f'{column} Count']
+    for column in MAX_COLUMNS:
+        users[column] = numeric[column]
+
+    distinct = aggregates.distinct.groupby(KEYS + ['Column'], sort=False)['Value'].agg(', '.join).unstack('Column')
+    users = users.join(distinct[DISTINCT_COLUMNS])
+    return users[COLUMNS]
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from typing import NamedTuple
+
+class UserIndex(NamedTuple):
+    """
+    Interning table between the Twitter IDs of the users (int64) and the vertices of the graphs (dense int32).
+
+    Attributes:
+        user_id (ndarray): Twitter ID of every vertex. Entry i is the user of vertex i.
+        sorted_id (ndarray): Twitter IDs in ascending order, searched with np.searchsorted.
+        sorted_vertex (ndarray): Vertex of every ID of sorted_id.
+    """
+    user_id: np.ndarray
+    sorted_id: np.ndarray
+    sorted_vertex: np.ndarray
+
+#=========================================================================================================================
+def as_int64_ids(ids) -> tuple:
+    """
+    Converts IDs stored as int64, nullable Int64 or float64 into a plain int64 array.
+
+    Args:
+        ids (array or Series): Twitter IDs. Missing values are allowed.
+
+    Returns:
+        tuple: The IDs as an int64 ndarray (0 where missing) and a bool ndarray, True where the ID is not missing
+    """
+    ids = pd.Series(ids)
+    valid = ids.notna().to_numpy()
+    return ids.fillna(0).to_numpy(dtype=np.int64), valid
+
+#=========================================================================================================================
+def get_user_index(user_id) -> UserIndex:
+    """
+    Creates the interning table of the Master Index.
+
+    Args:
+        user_id (array or Series): Twitter ID of every vertex, e.g. master_id['User ID']. IDs must be unique.
+
+    Returns:
+        UserIndex: The interning table
+    """
+    user_id, valid = as_int64_ids(user_id)
+    if not valid.all():
+        raise ValueError("The Master Index has users without ID")
+
+    order = np.argsort(user_id, kind='stable')
+    sorted_id = user_id[order]
+    if np.any(sorted_id[1:] == sorted_id[:-1]):
+        raise ValueError("The Master Index has repeated User IDs")
+    return UserIndex(user_id, sorted_id, order.astype(np.int32))
+
+#=========================================================================================================================
+def encode_users(index: UserIndex, ids) -> np.ndarray:
+    """
+    Vertex of every Twitter ID.
+
+    Args:
+        index (UserIndex): Interning table, see get_user_index.
+        ids (array or Series): Twitter IDs.
+
+    Returns:
+        ndarray: int32 vertices. Users that are not in the Master Index or missing IDs get -1
+    """
+    ids, valid = as_int64_ids(ids)
+    if len(index.sorted_id) == 0:
+        return np.full(len(ids), -1, dtype=np.int32)
+
+    # Position of every ID in the sorted IDs, IDs bigger than all of them are checked against the last one
+    position = np.minimum(np.searchsorted(index.sorted_id, ids), len(index.sorted_id) - 1)
+    found = valid & (index.sorted_id[position] == ids)
+    return np.where(found, index.sorted_vertex[position], -1).astype(np.int32)
+
+#=========================================================================================================================
+def decode_users(index: UserIndex, vertices) -> np.ndarray:
+    """
+    Twitter ID of every vertex.
+
+    Args:
+        index (UserIndex): Interning table, see get_user_index.
+        vertices (array): Vertices of the graphs.
+
+    Returns:
+        ndarray: int64 Twitter IDs
+    """
+    return index.user_id[np.asarray(vertices)]
+
+#=========================================================================================================================
+def save_user_index(index: UserIndex, file: str):
+    """
+    Saves the interning table, e.g. next to the Master Index as User_Index.npz
+
+    Args:
+        index (UserIndex): Interning table.
+        file (String): Path of the .npz file.
+    """
+    np.savez(file, **index._asdict())
+
+#=========================================================================================================================
+def load_user_index(file: str) -> UserIndex:
+    """
+    Loads an interning table saved with save_user_index.
+
+    Args:
+        file (String): Path of the .npz file.
+
+    Returns:
+        UserIndex: The interning table
+    """
+    with np.load(file) as data:
+        return UserIndex(**{field: data[field] for field in UserIndex._fields})
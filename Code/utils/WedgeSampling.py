@@ -0,0 +1,169 @@
+import graph_tool.all as gt
+import numpy as np
+import scipy.sparse as sp
+
+#=========================================================================================================================
+def get_wedge_matrix(g: gt.Graph, weight = None) -> sp.csr_matrix:
+    """
+    Gets the symmetric matrix W of the undirected version of the graph used by the clustering coefficients. Without
+    weights it is the adjacency of the simple graph (0 or 1), with weights it is the sum of the weights of the edges
+    between each pair, in any direction. Self loops are dropped.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        weight (String): The name of the EdgePropertyMap where weights of the edges resides.
+
+    Returns:
+        csr_matrix: Sparse matrix of shape (N,N) with sorted indices
+    """
+    N = g.num_vertices()
+    if weight is None:
+        edges = g.get_edges()
+        data = np.ones(len(edges))
+    else:
+        edges = g.get_edges([g.ep[weight]])
+        data = edges[:, 2].astype(float)
+    source = edges[:, 0].astype(np.int64)
+    target = edges[:, 1].astype(np.int64)
+
+    keep = source != target
+    W = sp.csr_matrix((data[keep], (source[keep], target[keep])), shape=(N, N))
+    W = W + W.T
+    if weight is None:
+        W.data[:] = 1
+    W.eliminate_zeros()
+    W.sort_indices()
+    return W
+
+#=========================================================================================================================
+def sample_neighbours(W: sp.csr_matrix, cumulative: np.ndarray, centers: np.ndarray, rng) -> np.ndarray:
+    """
+    Samples one neighbour of each center with probability proportional to the weight of the edge.
+
+    Args:
+        W (csr_matrix): Wedge matrix, see get_wedge_matrix.
+        cumulative (ndarray): Cumulative sum of W.data, starting with 0.
+        centers (ndarray): Vertices, all of them with at least one neighbour.
+        rng (Generator): Random number generator.
+
+    Returns:
+        ndarray: One neighbour of every center
+    """
+    first, last = W.indptr[centers], W.indptr[centers + 1] - 1
+    start, end = cumulative[first], cumulative[last + 1]
+    position = np.searchsorted(cumulative, start + rng.random(len(centers)) * (end - start), side='right') - 1
+    # Rounding can leave the position out of the row
+    position = np.clip(position, first, last)
+    return W.indices[position]
+
+#=========================================================================================================================
+def sample_wedges(W: sp.csr_matrix, centers: np.ndarray, rng) -> tuple:
+    """
+    Samples one wedge i - center - k (i != k) for each center, with probability proportional to w_ic * w_ck.
+
+    Args:
+        W (csr_matrix): Wedge matrix, see get_wedge_matrix.
+        centers (ndarray): Vertices, all of them with at least two neighbours.
+        rng (Generator): Random number generator.
+
+    Returns:
+        tuple: The ends of the wedges i and k
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(W.data)])
+    i = sample_neighbours(W, cumulative, centers, rng)
+    k = sample_neighbours(W, cumulative, centers, rng)
+
+    # Wedges that go back to the same vertex are sampled again
+    repeated = np.flatnonzero(i == k)
+    while len(repeated):
+        i[repeated] = sample_neighbours(W, cumulative, centers[repeated], rng)
+        k[repeated] = sample_neighbours(W, cumulative, centers[repeated], rng)
+        repeated = repeated[i[repeated] == k[repeated]]
+    return i, k
+
+#=========================================================================================================================
+def closing_weights(W: sp.csr_matrix, i: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+    Weight w_ik of the edge that closes every wedge, 0 if the wedge is open.
+
+    Args:
+        W (csr_matrix): Wedge matrix with sorted indices, see get_wedge_matrix.
+        i (ndarray): First end of the wedges.
+        k (ndarray): Second end of the wedges.
+
+    Returns:
+        ndarray: Weights of the closing edges
+    """
+    N = W.shape[0]
+    rows = np.repeat(np.arange(N, dtype=np.int64), np.diff(W.indptr))
+    keys = rows * N + W.indices
+    query = i.astype(np.int64) * N + k
+    position = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return np.where(keys[position] == query, W.data[position], 0.0)
+
+#=========================================================================================================================
+def global_clustering(g: gt.Graph, weight = None, samples = 100_000, seed = None) -> tuple:
+    """
+    Approximate global clustering coefficient with wedge sampling. Wedges i - j - k are sampled with probability
+    proportional to w_ij * w_jk and the coefficient is the average weight of the edge that closes them, which
+    estimates Tr(W^3) / sum_{i != k} (W^2)_ik, the definition of gt.global_clustering. Without weights this is the
+    fraction of closed wedges (transitivity). The time depends on the number of samples, not on the triangles.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        weight (String): The name of the EdgePropertyMap where weights of the edges resides.
+        samples (int): Number of sampled wedges.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        tuple: The clustering coefficient and its standard error, like gt.global_clustering
+    """
+    rng = np.random.default_rng(seed)
+    W = get_wedge_matrix(g, weight)
+
+    # Weight of the wedges centered in each vertex: sum_{i != k} w_ij * w_jk
+    strength = np.asarray(W.sum(axis=1)).ravel()
+    squares = np.asarray(W.multiply(W).sum(axis=1)).ravel()
+    wedges = np.maximum(strength ** 2 - squares, 0)
+    if wedges.sum() <= 0:
+        return 0.0, 0.0
+
+    centers = rng.choice(len(wedges), size=samples, p=wedges / wedges.sum())
+    i, k = sample_wedges(W, centers, rng)
+    closing = closing_weights(W, i, k)
+    se = closing.std(ddof=1) / np.sqrt(samples) if samples > 1 else 0.0
+    return float(closing.mean()), float(se)
+
+#=========================================================================================================================
+def local_clustering(g: gt.Graph, weight = None, samples = 100, seed = None) -> tuple:
+    """
+    Approximate local clustering coefficient of every vertex with wedge sampling, the same number of wedges is
+    sampled around every vertex. Vertices with less than two neighbours have coefficient 0, like gt.local_clustering.
+
+    Args:
+        g (Graph): The Graph object to analize.
+        weight (String): The name of the EdgePropertyMap where weights of the edges resides.
+        samples (int): Number of sampled wedges per vertex.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        tuple: Two arrays of shape (N,) with the clustering coefficient of every vertex and its standard error
+    """
+    rng = np.random.default_rng(seed)
+    W = get_wedge_matrix(g, weight)
+    N = W.shape[0]
+    values = np.zeros(N)
+    se = np.zeros(N)
+
+    vertices = np.flatnonzero(np.diff(W.indptr) >= 2)
+    if len(vertices) == 0:
+        return values, se
+
+    centers = np.repeat(vertices, samples)
+    i, k = sample_wedges(W, centers, rng)
+    closing = closing_weights(W, i, k).reshape(len(vertices), samples)
+
+    values[vertices] = closing.mean(axis=1)
+    if samples > 1:
+        se[vertices] = closing.std(axis=1, ddof=1) / np.sqrt(samples)
+    return values, se